@@ -1,64 +1,124 @@
 # Archivo: backend/Device/data_device.py
+import threading
+import numpy as np
 import pandas as pd
+from config.settings import Settings
+from backend.frame_utils import compact_frame, frame_fingerprint
+from backend.instrumentation import instrumented
 
+# Columnas de baja cardinalidad que se guardan como category
+DEVICE_CATEGORICAL_COLUMNS = ['model', 'organization', 'status_clean', 'enabled_clean']
+
+# -------------------------------------------------------------------------
+# ÍNDICE DE MODELOS / SOFTWARE (se construye una vez por catálogo)
+# -------------------------------------------------------------------------
+_MODEL_INDEX_CACHE = {}
+_MODEL_INDEX_LOCK = threading.Lock()
+_MODEL_INDEX_MAX = 8
+
+def _normalize_uuid(series):
+    """UUIDs como texto sin espacios y en minúsculas (evita fallos "invisibles" al cruzar)."""
+    return series.astype(str).str.strip().str.lower()
+
+def build_model_index(df_soft, df_models=None):
+    """
+    Índice version_uuid (normalizado) -> model_uuid, model_name, software_name.
+    Se cachea por huella del catálogo: con el mismo software/modelos no se reconstruye.
+    No modifica df_soft ni df_models.
+    """
+    fingerprint = (frame_fingerprint(df_soft), frame_fingerprint(df_models))
+    with _MODEL_INDEX_LOCK:
+        index = _MODEL_INDEX_CACHE.get(fingerprint)
+    if index is not None:
+        return index
+
+    if df_soft is None or df_soft.empty or 'uuid' not in df_soft.columns:
+        index = pd.DataFrame(columns=['model_uuid', 'model_name', 'software_name'])
+    else:
+        index = pd.DataFrame({
+            'version_uuid': _normalize_uuid(df_soft['uuid']),
+            'model_uuid': _normalize_uuid(df_soft['model_uuid']) if 'model_uuid' in df_soft.columns else None,
+            'software_name': df_soft['name'] if 'name' in df_soft.columns else None,
+        })
+        # Eliminamos duplicados por si acaso (un merge los multiplicaría)
+        index = index.drop_duplicates(subset=['version_uuid']).set_index('version_uuid')
+
+        if df_models is not None and not df_models.empty and {'uuid', 'name'} <= set(df_models.columns):
+            model_names = pd.Series(df_models['name'].values, index=_normalize_uuid(df_models['uuid']))
+            model_names = model_names[~model_names.index.duplicated()]
+            index['model_name'] = index['model_uuid'].map(model_names)
+        else:
+            index['model_name'] = None
+
+    with _MODEL_INDEX_LOCK:
+        if len(_MODEL_INDEX_CACHE) >= _MODEL_INDEX_MAX:
+            _MODEL_INDEX_CACHE.pop(next(iter(_MODEL_INDEX_CACHE)))
+        _MODEL_INDEX_CACHE[fingerprint] = index
+    return index
+
+def resolve_versions(version_uuids, index, column):
+    """
+    Resuelve `column` del índice para cada version_uuid de los dispositivos.
+    Se normalizan solo los valores distintos (factorize) y se expanden por código: sin merge.
+    """
+    codes, uniques = pd.factorize(version_uuids)
+    if len(uniques) == 0 or index.empty:
+        return pd.Series([None] * len(version_uuids), index=version_uuids.index, dtype=object)
+    resolved = _normalize_uuid(pd.Series(uniques)).map(index[column]).to_numpy(dtype=object)
+    values = resolved.take(codes)
+    values[codes == -1] = None  # version_uuid nulo
+    return pd.Series(values, index=version_uuids.index, dtype=object)
+
+@instrumented("process.merge_models")
 def _merge_model_info(df_devices, df_software, df_models):
     """
     Función auxiliar para cruzar Dispositivos -> Software -> Modelos
-    y obtener el nombre real del modelo.
+    y obtener el nombre real del modelo. Añade 'model_uuid' y 'real_model_name'
+    a df_devices (sin merge ni copia).
     """
     if df_devices.empty:
         return df_devices
 
-    # 1. Asegurar que las columnas clave sean string para evitar errores de merge
-    # Dispositivos -> Software
-    if 'version_uuid' in df_devices.columns:
-        df_devices['version_uuid'] = df_devices['version_uuid'].astype(str)
-    
-    # Software
-    if not df_software.empty and 'uuid' in df_software.columns:
-        df_software['uuid'] = df_software['uuid'].astype(str)
-        df_software['model_uuid'] = df_software['model_uuid'].astype(str)
-    
-    # Modelos
-    if not df_models.empty and 'uuid' in df_models.columns:
-        df_models['uuid'] = df_models['uuid'].astype(str)
-
-    # 2. Merge: Dispositivos + Software (por version_uuid)
-    # Usamos left join para no perder dispositivos sin versión conocida
-    df_merged = df_devices.merge(
-        df_software[['uuid', 'model_uuid']], 
-        left_on='version_uuid', 
-        right_on='uuid', 
-        how='left', 
-        suffixes=('', '_soft')
-    )
-
-    # 3. Merge: Resultado + Modelos (por model_uuid)
-    df_final = df_merged.merge(
-        df_models[['uuid', 'name']], 
-        left_on='model_uuid', 
-        right_on='uuid', 
-        how='left', 
-        suffixes=('', '_model_real')
-    )
-
-    # 4. Consolidar el nombre del modelo
-    # Si encontramos el nombre en la tabla modelos, lo usamos. Si no, fallback a 'name' original o 'Genérico'
-    if 'name_model_real' in df_final.columns:
-        df_final['real_model_name'] = df_final['name_model_real'].fillna('Desconocido')
-    else:
-        df_final['real_model_name'] = 'Desconocido'
-        
-    return df_final
+    if 'version_uuid' not in df_devices.columns:
+        df_devices['model_uuid'] = None
+        df_devices['real_model_name'] = 'Desconocido'
+        return df_devices
 
-def _get_status_label(val):
-    s = str(val).lower()
-    return "Conectado" if s in ["terminado", "online", "connected", "true"] else "Desconectado"
+    index = build_model_index(df_software, df_models)
+    df_devices['model_uuid'] = resolve_versions(df_devices['version_uuid'], index, 'model_uuid')
+    # Si encontramos el nombre en la tabla modelos, lo usamos. Si no, 'Desconocido'
+    df_devices['real_model_name'] = resolve_versions(df_devices['version_uuid'], index, 'model_name').fillna('Desconocido')
+    return df_devices
 
-def _get_enabled_label(val):
-    s = str(val).lower()
-    return "Habilitado" if s in ["terminado", "asignado", "fabricado", "true", "enabled"] else "Deshabilitado"
+# -------------------------------------------------------------------------
+# ETIQUETAS DE ESTADO (única implementación para Boards y Kiwi)
+# -------------------------------------------------------------------------
+def classify_states(df):
+    """
+    Añade las columnas de Settings.DEVICE_STATE_LABELS (status_clean, enabled_clean)
+    a partir de la columna 'state' (o 'status'). Solo se pasan a minúsculas los valores
+    distintos y la pertenencia se resuelve con isin: coste proporcional a nº de estados.
+    """
+    col_state = "state" if "state" in df.columns else "status"
+    if col_state not in df.columns:
+        for column, rule in Settings.DEVICE_STATE_LABELS.items():
+            df[column] = rule["default"]
+        return df
+
+    states = df[col_state]
+    if states.dtype == object:
+        # En columnas mixtas factorize trata True y 1 como el mismo valor: se comparan como texto
+        states = states.astype(str)
+    codes, uniques = pd.factorize(states)
+    lowered = pd.Index(uniques).astype(str).str.lower()
+    for column, rule in Settings.DEVICE_STATE_LABELS.items():
+        labels = [rule["default"], rule["match"]]
+        # Coincidencia por valor distinto + posición final False para los nulos (código -1)
+        matches = np.append(lowered.isin(rule["values"]), False)
+        df[column] = pd.Categorical.from_codes(matches[codes].astype("int8"), categories=labels)
+    return df
 
+@instrumented("process.boards")
 def prepare_boards(data, df_models=None, df_soft=None):
     """
     Prepara Boards. Acepta DataFrames opcionales de modelos y software para enriquecer la data.
@@ -66,7 +126,8 @@ def prepare_boards(data, df_models=None, df_soft=None):
     if isinstance(data, list):
         df = pd.DataFrame(data)
     elif isinstance(data, pd.DataFrame):
-        df = data.copy()
+        # Copia superficial: solo se añaden o reasignan columnas, el DataFrame recibido no se modifica
+        df = data.copy(deep=False)
     else:
         return pd.DataFrame()
 
@@ -91,24 +152,14 @@ def prepare_boards(data, df_models=None, df_soft=None):
     df["organization"] = df["final_client"].fillna("Sin Asignar") if "final_client" in df.columns else "Sin Asignar"
 
     # --- STATUS Y ENABLED ---
-    col_state = "state" if "state" in df.columns else "status"
-
-    def get_status_label(val):
-        s = str(val).lower()
-        return "Conectado" if s in ["terminado", "online", "connected", "true"] else "Desconectado"
+    classify_states(df)
 
-    def get_enabled_label(val):
-        s = str(val).lower()
-        return "Habilitado" if s in ["terminado", "asignado", "fabricado", "true", "enabled"] else "Deshabilitado"
-
-    df["status_clean"] = df[col_state].apply(get_status_label) if col_state in df.columns else "Desconectado"
-    df["enabled_clean"] = df[col_state].apply(get_enabled_label) if col_state in df.columns else "Deshabilitado"
-
-    return df
+    return compact_frame(df, DEVICE_CATEGORICAL_COLUMNS)
 
 # -------------------------------------------------------------------------
 # KIWI (Lógica Corregida: Version UUID == Software UUID)
 # -------------------------------------------------------------------------
+@instrumented("process.kiwi")
 def prepare_kiwi(data, df_models=None, df_soft=None):
     """
     Kiwi:
@@ -118,7 +169,8 @@ def prepare_kiwi(data, df_models=None, df_soft=None):
     if isinstance(data, list):
         df = pd.DataFrame(data)
     elif isinstance(data, pd.DataFrame):
-        df = data.copy()
+        # Copia superficial: solo se añaden o reasignan columnas, el DataFrame recibido no se modifica
+        df = data.copy(deep=False)
     else:
         return pd.DataFrame()
 
@@ -127,37 +179,11 @@ def prepare_kiwi(data, df_models=None, df_soft=None):
 
     # --- LÓGICA DE CRUCE DE MODELOS ---
     if df_soft is not None and not df_soft.empty and 'version_uuid' in df.columns:
-        
-        # 1. Limpieza de IDs (strip y lower para evitar errores "invisibles")
-        df['version_uuid'] = df['version_uuid'].astype(str).str.strip().str.lower()
-        
-        # Trabajamos sobre una copia limpia de software
-        df_soft_clean = df_soft.copy()
-        if 'uuid' in df_soft_clean.columns:
-            df_soft_clean['uuid'] = df_soft_clean['uuid'].astype(str).str.strip().str.lower()
-        
-        # 2. Preparamos el DataFrame de Software para el cruce
-        # RENOMBRAMOS explícitamente 'name' -> 'software_name' para evitar ambigüedades en el merge
-        df_soft_ready = df_soft_clean[['uuid', 'name']].rename(columns={'name': 'software_name'})
-        
-        # Eliminamos duplicados por si acaso
-        df_soft_ready = df_soft_ready.drop_duplicates(subset=['uuid'])
-
-        # 3. Merge: Kiwi -> Software
-        df_merged = df.merge(
-            df_soft_ready, 
-            left_on='version_uuid', 
-            right_on='uuid', 
-            how='left'
-        )
-
-        # 4. Asignamos el nombre
-        if 'software_name' in df_merged.columns:
-            fallback = df["ssid"] if "ssid" in df.columns else "Genérico"
-            df["model"] = df_merged['software_name'].fillna(fallback)
-        else:
-            df["model"] = df["ssid"].fillna("Genérico") if "ssid" in df.columns else "Genérico"
-            
+        # Kiwi['version_uuid'] -> Software['name'] a través del índice cacheado
+        index = build_model_index(df_soft, df_models)
+        software_name = resolve_versions(df['version_uuid'], index, 'software_name')
+        fallback = df["ssid"] if "ssid" in df.columns else "Genérico"
+        df["model"] = software_name.fillna(fallback)
     else:
         # Fallback si no hay datos de software
         df["model"] = df["ssid"].fillna("Genérico") if "ssid" in df.columns else "Genérico"
@@ -165,11 +191,6 @@ def prepare_kiwi(data, df_models=None, df_soft=None):
     # --- RESTO DE CAMPOS ---
     df["organization"] = "Sin Asignar"
 
-    col_state = "state" if "state" in df.columns else "status"
-    
-    # Asegúrate de tener estas funciones auxiliares disponibles en el archivo
-    # (Definidas al inicio de data_device.py)
-    df["status_clean"] = df[col_state].apply(_get_status_label) if col_state in df.columns else "Desconectado"
-    df["enabled_clean"] = df[col_state].apply(_get_enabled_label) if col_state in df.columns else "Deshabilitado"
+    classify_states(df)
 
-    return df
\ No newline at end of file
+    return compact_frame(df, DEVICE_CATEGORICAL_COLUMNS)
\ No newline at end of file
@@ -0,0 +1,127 @@
+# Archivo: backend/Device/device_filters.py
+import threading
+import numpy as np
+import pandas as pd
+from backend.aggregations import aggregation_memo
+
+# Columnas por las que se filtra / agrega en devices_view
+INDEX_COLUMNS = ['organization', 'model', 'status_clean', 'enabled_clean']
+MISSING_LABEL = "Desconocido"
+
+
+class DeviceFilterEngine:
+    """
+    Índices invertidos sobre un DataFrame de dispositivos (boards o kiwi) para los drill-downs.
+
+    Para cada columna de INDEX_COLUMNS se guarda el código de cada fila y, por valor, las
+    posiciones de sus filas. Un filtro {columna: valor} se resuelve intersectando listas de
+    posiciones (empezando por la más corta) y los conteos salen de un bincount sobre los
+    códigos de esas posiciones: nunca se copia ni se recorre el inventario completo.
+    Los resultados se memoizan por estado de filtro.
+
+    No guarda referencia al DataFrame (se cachea junto a él en aggregation_memo):
+    para obtener las filas se usa df.iloc[engine.positions(...)].
+    """
+
+    def __init__(self, df, columns=INDEX_COLUMNS, max_cache=512):
+        self.n_rows = len(df)
+        self.max_cache = max_cache
+        self._codes = {}
+        self._labels = {}
+        self._index = {}
+        self._cache = {}
+        self._lock = threading.Lock()
+        for col in columns:
+            self._build(col, df[col] if col in df.columns else None)
+
+    def _build(self, col, series):
+        if series is None:
+            # Columna ausente: todas las filas en una única categoría
+            codes = np.zeros(self.n_rows, dtype=np.int32)
+            labels = [MISSING_LABEL]
+        else:
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                codes = series.cat.codes.to_numpy().astype(np.int32)
+                labels = [str(c) for c in series.cat.categories]
+            else:
+                codes, uniques = pd.factorize(series.astype(str) if series.dtype == object else series)
+                codes = codes.astype(np.int32)
+                labels = [str(u) for u in uniques]
+            if (codes < 0).any():
+                # Nulos: etiqueta propia al final (como el astype(str) del filtrado original)
+                codes = np.where(codes < 0, len(labels), codes).astype(np.int32)
+                labels.append("nan")
+        # Posiciones agrupadas por código: un argsort estable y un corte por conteos
+        order = np.argsort(codes, kind="stable")
+        counts = np.bincount(codes, minlength=len(labels))
+        bounds = np.cumsum(counts)[:-1]
+        groups = np.split(order, bounds)
+        self._codes[col] = codes
+        self._labels[col] = labels
+        self._index[col] = {label: positions for label, positions in zip(labels, groups)}
+
+    # --- CONSULTAS ---
+    @staticmethod
+    def _key(filters):
+        return tuple(sorted((col, str(val)) for col, val in (filters or {}).items() if val is not None))
+
+    def _memo(self, key, compute):
+        with self._lock:
+            if key in self._cache:
+                return self._cache[key]
+        value = compute()
+        with self._lock:
+            if len(self._cache) >= self.max_cache:
+                self._cache.pop(next(iter(self._cache)))
+            self._cache[key] = value
+        return value
+
+    def positions(self, filters=None):
+        """Posiciones (ordenadas) de las filas que cumplen {columna: valor}; None = todas."""
+        key = self._key(filters)
+        if not key:
+            return None
+        return self._memo(("positions", key), lambda: self._intersect(key))
+
+    def _intersect(self, key):
+        empty = np.array([], dtype=np.int64)
+        lists = [self._index[col].get(val, empty) for col, val in key]
+        lists.sort(key=len)
+        result = lists[0]
+        for other in lists[1:]:
+            if not len(result):
+                break
+            result = np.intersect1d(result, other, assume_unique=True)
+        return result
+
+    def count(self, filters=None):
+        positions = self.positions(filters)
+        return self.n_rows if positions is None else len(positions)
+
+    def counts(self, column, filters=None, value_name="count"):
+        """Tabla [column, count] como aggregations.count_table, pero sobre el índice."""
+        key = ("counts", column, self._key(filters))
+
+        def compute():
+            codes = self._codes[column]
+            positions = self.positions(filters)
+            subset = codes if positions is None else codes[positions]
+            totals = np.bincount(subset, minlength=len(self._labels[column]))
+            present = np.flatnonzero(totals)
+            # Mayor a menor; a igualdad, por orden de aparición (como value_counts)
+            order = present[np.argsort(-totals[present], kind="stable")]
+            return pd.DataFrame({
+                column: [self._labels[column][i] for i in order],
+                value_name: totals[order].astype("int64"),
+            })
+        return self._memo(key, compute)
+
+    def options(self, column, filters=None):
+        """Valores distintos de `column` presentes con los filtros aplicados, ordenados."""
+        key = ("options", column, self._key(filters))
+        return self._memo(key, lambda: sorted(self.counts(column, filters)[column].tolist()))
+
+
+def get_filter_engine(df):
+    """Motor de filtros del DataFrame (se construye una vez por foto de datos)."""
+    return aggregation_memo.get(df, ("device_filter_engine",), lambda: DeviceFilterEngine(df))
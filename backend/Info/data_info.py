@@ -1,20 +1,12 @@
+import numpy as np
 import pandas as pd
-import json
-from datetime import datetime
-
-def safe_json(x):
-    """Convierte strings JSON a dict. Si falla → None"""
-    if isinstance(x, dict):
-        return x
-    if isinstance(x, str):
-        if not x.strip():
-            return None
-        try:
-            return json.loads(x.replace("'", '"'))
-        except:
-            return None
-    return None
+from config.settings import Settings
+from backend.json_columns import decode_json_column
+from backend.frame_utils import compact_frame
+from backend.instrumentation import instrumented
 
+# Columnas de baja cardinalidad que se guardan como category
+INFO_CATEGORICAL_COLUMNS = ["update_status"]
 
 def extract_version(json_obj):
     """Extrae la versión 'quiiotd_version' del diccionario."""
@@ -30,36 +22,64 @@ def extract_compilation(json_obj):
     return json_obj.get("compilation_date", None)
 
 
-def compute_update_status(date_str):
-    """Clasifica dispositivos como Actualizados/Desactualizados según fecha >= Jun 2025"""
-    if not date_str:
-        return "Sin Datos"
-    try:
-        date_obj = datetime.strptime(date_str, "%Y-%m-%d")
-        cutoff = datetime(2025, 6, 1)
-        return "Actualizado" if date_obj >= cutoff else "Desactualizado"
-    except:
-        return "Desconocido"
+def _update_cutoff():
+    """Fecha de corte (Settings.SOFTWARE_UPDATE_CUTOFF) a partir de la cual un firmware está al día."""
+    return pd.Timestamp(Settings.SOFTWARE_UPDATE_CUTOFF)
 
 
+def parse_compilation_dates(dates):
+    """Convierte la columna de fechas (ISO 8601, con o sin hora/zona) a datetime naive; NaT si no se puede."""
+    parsed = pd.to_datetime(dates, format="ISO8601", errors="coerce", utc=True)
+    return parsed.dt.tz_localize(None)
+
+
+def classify_update_status(dates, dates_dt, cutoff=None):
+    """
+    Estado de actualización vectorizado:
+    sin fecha -> "Sin Datos", fecha ilegible -> "Desconocido", >= corte -> "Actualizado", resto -> "Desactualizado".
+    """
+    cutoff = _update_cutoff() if cutoff is None else pd.Timestamp(cutoff)
+    missing = dates.isna().to_numpy() | (dates.astype(str).str.strip() == "").to_numpy()
+    unparsed = dates_dt.isna().to_numpy()
+    updated = (dates_dt >= cutoff).to_numpy()
+    status = np.select(
+        [missing, unparsed, updated],
+        ["Sin Datos", "Desconocido", "Actualizado"],
+        default="Desactualizado",
+    )
+    return pd.Series(status, index=dates.index)
+
+
+@instrumented("process.info")
 def process_devicesInfo(json_data, info_column_name='info'):
-    """Procesa JSON crudo y añade columnas normalizadas."""
-    if not json_data:
+    """
+    Procesa JSON crudo y añade columnas normalizadas:
+    quiiotd_version, compilation_date, compilation_date_dt (datetime) y update_status.
+    Las vistas solo leen estas columnas, no las recalculan.
+    """
+    if isinstance(json_data, pd.DataFrame):
+        if json_data.empty:
+            return pd.DataFrame()
+        # Copia superficial: solo se añaden columnas nuevas, el DataFrame recibido no se modifica
+        df = json_data.copy(deep=False)
+    elif not json_data:
         return pd.DataFrame()
-
-    df = pd.DataFrame(json_data)
+    else:
+        df = pd.DataFrame(json_data)
 
     if "info" not in df.columns:
         df["info"] = None
         df["quiiotd_version"] = None
         df["compilation_date"] = None
+        df["compilation_date_dt"] = pd.NaT
         df["update_status"] = "Sin Datos"
-        return df
+        return compact_frame(df, INFO_CATEGORICAL_COLUMNS)
 
-    df["info_json"] = df["info"].apply(safe_json)
+    info = decode_json_column(df["info"], "info").tolist()
 
-    df["quiiotd_version"] = df["info_json"].apply(extract_version)
-    df["compilation_date"] = df["info_json"].apply(extract_compilation)
-    df["update_status"] = df["compilation_date"].apply(compute_update_status)
+    df["quiiotd_version"] = pd.Series([extract_version(obj) for obj in info], index=df.index, dtype=object)
+    df["compilation_date"] = pd.Series([extract_compilation(obj) for obj in info], index=df.index, dtype=object)
+    df["compilation_date_dt"] = parse_compilation_dates(df["compilation_date"])
+    df["update_status"] = classify_update_status(df["compilation_date"], df["compilation_date_dt"])
 
-    return df.drop(columns=["info_json"], errors="ignore")
+    return compact_frame(df, INFO_CATEGORICAL_COLUMNS)
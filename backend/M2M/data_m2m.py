@@ -1,21 +1,13 @@
 import pandas as pd
-import json
+import numpy as np
+from backend.json_columns import decode_json_column
+from backend.frame_utils import compact_frame
+from backend.instrumentation import instrumented
 
 # ================================
 # FUNCIONES AUXILIARES
 # ================================
 
-def safe_json(x):
-    """Convierte strings JSON a dict. Si falla → None"""
-    if isinstance(x, dict):
-        return x
-    if isinstance(x, str):
-        try: 
-            return json.loads(x.replace("'", '"'))  # Arreglo típico del Excel
-        except:
-            return None
-    return None
-
 def extract_total_consumption(json_obj):
     """
     Extrae el consumo total (voice + sms + data) desde el JSON.
@@ -33,7 +25,7 @@ def extract_total_consumption(json_obj):
         sms = json_obj.get("sms", {}).get("value", 0) or 0
         data = json_obj.get("data", {}).get("value", 0) or 0
         return voice + sms + data
-    except:
+    except (AttributeError, TypeError, ValueError):
         return None
 
 def extract_countryCode(json_obj):
@@ -41,14 +33,17 @@ def extract_countryCode(json_obj):
         return None
     try:
         return json_obj.get("sgsn", {}).get("operator", {}).get("countryCode", None)
-    except:
+    except (AttributeError, TypeError, ValueError):
         return None
 
 def extract_alarm_count(json_obj):
-    """Cuenta alarmas de la columna 'alarms'."""
+    """
+    Cuenta alarmas de la columna 'alarms'. La API la envía como lista de contadores
+    ([0] = sin alarmas, [2] = dos alarmas): se suman los valores, no se cuentan elementos.
+    """
     if not isinstance(json_obj, list):
         return 0
-    return len(json_obj)
+    return int(sum(v for v in json_obj if isinstance(v, (int, float)) and not isinstance(v, bool)))
 
 def format_bytes_to_readable(value_bytes):
     """Convierte bytes a MB o GB según magnitud."""
@@ -76,65 +71,108 @@ def determine_usage_tier(mb_value):
         return "Extremo (> 100 MB)"
 
 
+# ================================
+# VERSIONES VECTORIZADAS
+# ================================
+
+# Códigos ratType de la API -> tipo de red
+NETWORK_TYPES = {1: '3G', 2: '2G', 5: '3.5G', 6: '4G', 8: 'NB-IoT', 255: 'Sin Información', 'N/A': 'Sin Información'}
+
+# Columnas de baja cardinalidad que se guardan como category
+M2M_CATEGORICAL_COLUMNS = [
+    'status_clean', 'rate_plan', 'network_type', 'organization', 'country_code',
+    'usage_tier_daily', 'usage_tier_month',
+]
+
+USAGE_TIERS = ["Inactivo (0 MB)", "Bajo (< 1 MB)", "Medio (1 - 10 MB)", "Alto (10 - 100 MB)", "Extremo (> 100 MB)"]
+
+def _column_or_default(df, column, default):
+    """df[column] o una serie constante alineada con el índice si la columna no existe."""
+    if column in df.columns:
+        return df[column]
+    return pd.Series([default] * len(df), index=df.index)
+
+def parse_json_column(series, column=None):
+    """Parsea una columna JSON una sola vez con el decodificador compartido."""
+    return decode_json_column(series, column)
+
+def total_consumption_bytes(parsed):
+    """Consumo total en bytes por fila a partir de la columna ya parseada (0 si no hay datos)."""
+    totals = [extract_total_consumption(obj) if obj is not None else None for obj in parsed.tolist()]
+    # Si todas son None la serie sería object: se fuerza float para el cálculo numérico posterior
+    return pd.Series(totals, index=parsed.index, dtype=object).fillna(0).astype("float64")
+
+def usage_tiers(mb_values):
+    """determine_usage_tier vectorizado sobre una serie de MB."""
+    mb = mb_values.to_numpy(dtype=float)
+    conditions = [mb <= 0, mb < 1, mb < 10, mb < 100]
+    return pd.Series(np.select(conditions, USAGE_TIERS[:4], default=USAGE_TIERS[4]), index=mb_values.index)
+
+def readable_sizes(bytes_values):
+    """format_bytes_to_readable vectorizado: MB por debajo de 1000 MB, GB a partir de ahí."""
+    # Muchas SIMs comparten consumo (p.ej. 0 bytes): solo se formatean los valores distintos
+    unique_bytes, inverse = np.unique(bytes_values.to_numpy(dtype=float), return_inverse=True)
+    mb = unique_bytes / 1_048_576
+    labels = np.array([f"{m / 1024:.2f} GB" if m >= 1000 else f"{m:.2f} MB" for m in mb.tolist()], dtype=object)
+    return pd.Series(labels[inverse.ravel()], index=bytes_values.index)
+
+def map_network_type(rat_type):
+    """Traduce ratType a etiqueta; los códigos no contemplados se dejan tal cual."""
+    raw = rat_type.fillna(255).astype(object)
+    mapped = raw.map(NETWORK_TYPES)
+    return mapped.where(mapped.notna(), raw)
+
+
 # ================================
 # PROCESAMIENTO DE M2M
 # ================================
 
+@instrumented("process.m2m")
 def process_m2m(json_data):
-    if not json_data:
+    if isinstance(json_data, pd.DataFrame):
+        if json_data.empty:
+            return pd.DataFrame()
+        # Copia superficial: solo se añaden columnas nuevas, el DataFrame recibido no se modifica
+        df = json_data.copy(deep=False)
+    elif not json_data:
         return pd.DataFrame()
+    else:
+        df = pd.DataFrame(json_data)
 
-    df = pd.DataFrame(json_data)
-
-    # ESTADO
-    df['status_clean'] = df.get('lifeCycleStatus', pd.Series([None]*len(df))).fillna('DESCONOCIDO')
+    # ESTADO / TARIFA / RED / ORGANIZACIÓN
+    df['status_clean'] = _column_or_default(df, 'lifeCycleStatus', None).fillna('DESCONOCIDO')
+    df['rate_plan'] = _column_or_default(df, 'servicePack', None).fillna('Sin Plan')
+    df['network_type'] = map_network_type(_column_or_default(df, 'ratType', 255))
+    df['organization'] = _column_or_default(df, 'customField1', "N/A").astype(str)
 
-    # TARIFA
-    df['rate_plan'] = df.get('servicePack', pd.Series([None]*len(df))).fillna('Sin Plan')
+    # CONSUMO: cada columna JSON se parsea una única vez
+    df['consumptionDaily_json'] = parse_json_column(_column_or_default(df, 'consumptionDaily', None), 'consumptionDaily')
+    df['consumptionMonthly_json'] = parse_json_column(_column_or_default(df, 'consumptionMonthly', None), 'consumptionMonthly')
 
-    # TIPO DE RED
-    df['network_type'] = df.get('ratType', pd.Series([255]*len(df))).fillna(255)
-    df.loc[df['network_type'] == 1, 'network_type'] = '3G'
-    df.loc[df['network_type'] == 2, 'network_type'] = '2G'
-    df.loc[df['network_type'] == 5, 'network_type'] = '3.5G'
-    df.loc[df['network_type'] == 6, 'network_type'] = '4G'
-    df.loc[df['network_type'] == 8, 'network_type'] = 'NB-IoT'
-    df.loc[df['network_type'].isin([255, 'N/A']), 'network_type'] = 'Sin Información'
+    df['cons_daily'] = total_consumption_bytes(df['consumptionDaily_json']) # Bytes
+    df['cons_month'] = total_consumption_bytes(df['consumptionMonthly_json']) # Bytes
 
-    # ORGANIZACIÓN
-    df['organization'] = df.get('customField1', pd.Series(["N/A"]*len(df))).astype(str)
+    # MB (1 MB = 1024 * 1024 bytes) para gráficos
+    df['cons_daily_mb'] = df['cons_daily'] / 1048576.0
+    df['cons_month_mb'] = df['cons_month'] / 1048576.0
 
-    # 2. PROCESAMIENTO ROBUSTO DE CONSUMO
-    # Extraemos bytes crudos
-    df['consumptionDaily_json'] = df.get('consumptionDaily', pd.Series([None]*len(df))).apply(safe_json)
-    df['consumptionMonthly_json'] = df.get('consumptionMonthly', pd.Series([None]*len(df))).apply(safe_json)
+    # Categorización (Tiers) y strings legibles para tablas/tooltips, en bloque
+    df['usage_tier_daily'] = usage_tiers(df['cons_daily_mb'])
+    df['usage_tier_month'] = usage_tiers(df['cons_month_mb'])
+    df['cons_daily_readable'] = readable_sizes(df['cons_daily'])
 
-    df['cons_daily'] = df['consumptionDaily_json'].apply(extract_total_consumption).fillna(0) # Bytes int
-    df['cons_month'] = df['consumptionMonthly_json'].apply(extract_total_consumption).fillna(0) # Bytes int
+    # COUNTRY CODE desde presence JSON
+    df['presence_json'] = parse_json_column(_column_or_default(df, 'presence', None), 'presence')
+    df['country_code'] = pd.Series(
+        [extract_countryCode(obj) for obj in df['presence_json'].tolist()], index=df.index
+    ).fillna("N/A")
 
-    # --- MEJORA LÓGICA 1: Conversión a Float (MB) para Gráficos ---
-    # Convertimos a MB (1 MB = 1024 * 1024 bytes)
-    df['cons_daily_mb'] = df['cons_daily'] / 1048576.0 
-    df['cons_month_mb'] = df['cons_month'] / 1048576.0 
-    
-    # --- MEJORA LÓGICA 2: Categorización (Tiers) ---
-    # Esto permite hacer gráficos de pastel o barras agrupadas
-    df['usage_tier_daily'] = df['cons_daily_mb'].apply(determine_usage_tier)
-    df['usage_tier_month'] = df['cons_month_mb'].apply(determine_usage_tier)
-    # Strings legibles para Tablas/Tooltips
-    df['cons_daily_readable'] = df['cons_daily'].apply(format_bytes_to_readable)
-
-    # 5. COUNTRY CODE desde presence JSON
-    df['presence_json'] = df['presence'].apply(safe_json)
-    df['country_code'] = df['presence_json'].apply(extract_countryCode)
-    df['country_code'] = df['country_code'].fillna("N/A")
-
-    # Conversión a formato legible MB/GB
-    df['cons_daily_readable'] = df['cons_daily'].apply(format_bytes_to_readable)
-    df['cons_month_readable'] = df['cons_month'].apply(format_bytes_to_readable)
+    df['cons_month_readable'] = readable_sizes(df['cons_month'])
 
     # ALARMAS
-    df['alarms_json'] = df.get('alarms', pd.Series([None]*len(df))).apply(safe_json)
-    df['alarm_count'] = df['alarms_json'].apply(extract_alarm_count)
+    df['alarms_json'] = parse_json_column(_column_or_default(df, 'alarms', None), 'alarms')
+    df['alarm_count'] = np.fromiter(
+        (extract_alarm_count(obj) for obj in df['alarms_json'].tolist()), dtype=np.int64, count=len(df)
+    )
 
-    return df
\ No newline at end of file
+    return compact_frame(df, M2M_CATEGORICAL_COLUMNS)
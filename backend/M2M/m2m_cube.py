@@ -0,0 +1,92 @@
+# Archivo: backend/M2M/m2m_cube.py
+import numpy as np
+import pandas as pd
+from backend.instrumentation import instrumented
+
+# Dimensiones del cubo: todo lo que filtra o agrupa la vista de M2M
+CUBE_DIMENSIONS = [
+    'organization', 'status_clean', 'network_type', 'country_code', 'rate_plan',
+    'usage_tier_daily', 'usage_tier_month',
+]
+# Medida -> (columna de origen, agregación). Solo se calculan las que tienen columna de origen
+CUBE_MEASURES = {
+    'alarms': ('alarm_count', 'sum'),
+    'cons_daily': ('cons_daily', 'sum'),  # Bytes
+    'cons_month': ('cons_month', 'sum'),  # Bytes
+    'cons_daily_mb_max': ('cons_daily_mb', 'max'),
+    'cons_month_mb_max': ('cons_month_mb', 'max'),
+}
+
+
+@instrumented("process.m2m_cube")
+def build_m2m_cube(df_m2m):
+    """
+    Cubo de M2M: una fila por combinación organización x estado x red x país x plan x tiers
+    con nº de SIMs, SIMs con alarmas, suma de alarmas, bytes consumidos y máximos de MB.
+    Se calcula una vez por foto de datos; los KPIs y tartas de la vista son cortes del cubo
+    (su tamaño depende de las combinaciones presentes, no del nº de SIMs).
+    """
+    if df_m2m is None or df_m2m.empty:
+        return pd.DataFrame()
+
+    dims = [col for col in CUBE_DIMENSIONS if col in df_m2m.columns]
+    work = pd.DataFrame({col: df_m2m[col] for col in dims})
+    work['sims'] = np.ones(len(df_m2m), dtype=np.int64)
+    if 'alarm_count' in df_m2m.columns:
+        work['sims_alarm'] = (df_m2m['alarm_count'] > 0).astype(np.int64)
+    aggs = {'sims': ('sims', 'sum')}
+    if 'sims_alarm' in work.columns:
+        aggs['sims_alarm'] = ('sims_alarm', 'sum')
+    for measure, (source, func) in CUBE_MEASURES.items():
+        if source in df_m2m.columns:
+            work[measure] = df_m2m[source]
+            aggs[measure] = (measure, func)
+
+    if not dims:
+        return pd.DataFrame([{measure: work[col].agg(func) for measure, (col, func) in aggs.items()}])
+    return work.groupby(dims, observed=True, dropna=False, sort=False).agg(**aggs).reset_index()
+
+
+def cube_slice(cube, **filters):
+    """Corte del cubo: filas que cumplen {dimensión: valor}. Los valores None no filtran."""
+    mask = np.ones(len(cube), dtype=bool)
+    for dim, value in filters.items():
+        if value is not None and dim in cube.columns:
+            mask &= (cube[dim] == value).to_numpy()
+    return cube if mask.all() else cube[mask]
+
+
+def cube_counts(cube, dimension, measure='sims', value_name='count'):
+    """Tabla [dimension, count] como aggregations.count_table, sumando `measure` en el cubo."""
+    if cube.empty or dimension not in cube.columns:
+        return pd.DataFrame({dimension: pd.Series(dtype=object), value_name: pd.Series(dtype="int64")})
+    counts = cube.groupby(dimension, observed=True, dropna=False)[measure].sum()
+    counts = counts[counts > 0].sort_values(ascending=False, kind="stable")
+    table = counts.rename_axis(dimension).reset_index(name=value_name)
+    table[dimension] = table[dimension].astype(str)
+    return table
+
+
+def cube_totals(cube):
+    """KPIs de un corte: totales, máximos y medias por SIM (None si falta la medida)."""
+    sims = int(cube['sims'].sum()) if 'sims' in cube.columns else 0
+
+    def total(measure, func='sum'):
+        if measure not in cube.columns or cube.empty:
+            return None
+        return getattr(cube[measure], func)()
+
+    totals = {
+        'sims': sims,
+        'alarms': total('alarms'),
+        'sims_alarm': total('sims_alarm'),
+        'cons_daily': total('cons_daily'),
+        'cons_month': total('cons_month'),
+        'cons_daily_mb_max': total('cons_daily_mb_max', 'max'),
+        'cons_month_mb_max': total('cons_month_mb_max', 'max'),
+    }
+    # Medias en MB por SIM a partir de las sumas en bytes
+    for name in ('cons_daily', 'cons_month'):
+        value = totals[name]
+        totals[f'{name}_mb_mean'] = value / 1048576.0 / sims if value is not None and sims else None
+    return totals
@@ -0,0 +1,85 @@
+# Archivo: backend/aggregations.py
+import threading
+import weakref
+import pandas as pd
+
+
+def count_table(df, column, value_name="count"):
+    """
+    Tabla compacta [column, count] ordenada de mayor a menor.
+    Es lo que deben recibir los gráficos: su tamaño depende del nº de categorías, no de filas.
+    """
+    if df is None or df.empty or column not in df.columns:
+        return pd.DataFrame({column: pd.Series(dtype=object), value_name: pd.Series(dtype="int64")})
+    counts = df[column].value_counts()
+    counts = counts[counts > 0]  # columnas category: sin categorías vacías
+    table = counts.rename_axis(column).reset_index(name=value_name)
+    # Etiquetas como texto plano: Plotly no necesita el dtype category y así el JSON es mínimo
+    table[column] = table[column].astype(str)
+    return table
+
+
+def count_tables(df, columns, value_name="count"):
+    """{columna: count_table} para varias columnas de una vez."""
+    return {col: count_table(df, col, value_name) for col in columns}
+
+
+class FrameMemo:
+    """
+    Memoiza resultados derivados de un DataFrame (conteos, agregados...) por estado de filtro.
+    Se asocia al objeto DataFrame base: cuando la foto de datos cambia, el DataFrame es otro
+    y las entradas viejas se liberan solas al desaparecer el original.
+    """
+
+    def __init__(self, max_entries_per_frame=256):
+        self.max_entries_per_frame = max_entries_per_frame
+        self._frames = {}
+        self._lock = threading.Lock()
+        # DataFrames ya liberados, pendientes de quitar de _frames (ver _forget)
+        self._dead = []
+
+    def get(self, df, key, compute):
+        """Devuelve compute() cacheado para (df, key)."""
+        frame_id = id(df)
+        with self._lock:
+            self._purge()
+            entry = self._frames.get(frame_id)
+            if entry is not None and entry[0]() is df and key in entry[1]:
+                return entry[1][key]
+
+        value = compute()
+
+        with self._lock:
+            self._purge()
+            entry = self._frames.get(frame_id)
+            if entry is None or entry[0]() is not df:
+                ref = weakref.ref(df, lambda _ref, fid=frame_id: self._forget(fid, _ref))
+                entry = (ref, {})
+                self._frames[frame_id] = entry
+            results = entry[1]
+            if len(results) >= self.max_entries_per_frame:
+                results.pop(next(iter(results)))  # FIFO: se descarta el estado más antiguo
+            results[key] = value
+        return value
+
+    def _forget(self, frame_id, ref):
+        # Callback del weakref: lo lanza el recolector en cualquier punto, incluso dentro de
+        # get() con el lock tomado. Sin lock: solo se anota (append es atómico) y se purga después.
+        self._dead.append((frame_id, ref))
+
+    def _purge(self):
+        """Quita las entradas de los DataFrames liberados. Se llama con el lock tomado."""
+        while self._dead:
+            frame_id, ref = self._dead.pop()
+            entry = self._frames.get(frame_id)
+            if entry is not None and entry[0] is ref:
+                del self._frames[frame_id]
+
+    def clear(self):
+        with self._lock:
+            self._frames.clear()
+            self._dead.clear()
+
+
+# Memo compartida por las vistas (un proceso de Streamlit = una memo)
+aggregation_memo = FrameMemo()
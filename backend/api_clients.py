@@ -1,18 +1,94 @@
 # Archivo: backend/api_client.py
+import threading
+import time
+from http.cookiejar import DefaultCookiePolicy
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import requests
-from config.settings import Settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import pandas as pd
+from config.settings import Settings
+from backend.export_worker import get_export_worker
+from backend.instrumentation import stage, payload_rows
+
+_shared_session = None
+_session_lock = threading.Lock()
+
+def build_session():
+    """
+    Crea una sesión HTTP con pool de conexiones keep-alive y reintentos con backoff exponencial.
+    No guarda cookies: la sesión se comparte entre usuarios (y el refresco en segundo plano) y
+    una cookie de la respuesta de uno se enviaría en las peticiones de los demás.
+    La autenticación va siempre en la cabecera Authorization de cada CoreClient.
+    """
+    retry = Retry(
+        total=Settings.HTTP_MAX_RETRIES,
+        connect=Settings.HTTP_MAX_RETRIES,
+        read=Settings.HTTP_MAX_RETRIES,
+        status=Settings.HTTP_MAX_RETRIES,
+        backoff_factor=Settings.HTTP_BACKOFF_FACTOR,
+        status_forcelist=Settings.HTTP_RETRY_STATUSES,
+        allowed_methods=frozenset({"GET"}),  # el login (POST) no se reintenta
+        respect_retry_after_header=True,
+        raise_on_status=False,  # devolvemos la última respuesta y raise_for_status() decide
+    )
+    adapter = HTTPAdapter(
+        pool_connections=Settings.HTTP_POOL_CONNECTIONS,
+        pool_maxsize=Settings.HTTP_POOL_MAXSIZE,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))  # rechaza todas
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def get_shared_session():
+    """Sesión única por proceso: los reruns de Streamlit reutilizan las conexiones abiertas."""
+    global _shared_session
+    with _session_lock:
+        if _shared_session is None:
+            _shared_session = build_session()
+        return _shared_session
+
+def _lookup_path(payload, path):
+    """Lee 'a.b.c' dentro de un dict anidado; None si no existe."""
+    value = payload
+    for part in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+def make_client(token=None):
+    """CoreClient según Settings.CLIENT_BACKEND: API real o replay de ficheros locales."""
+    if Settings.CLIENT_BACKEND == "replay":
+        from backend.replay_client import ReplayClient  # importación diferida: replay hereda de CoreClient
+        return ReplayClient(token)
+    return CoreClient(token)
 
 class CoreClient:
-    def __init__(self, token=None):
+    # Endpoints de la flota: nombre lógico -> (url, fichero de exportación, params)
+    ENDPOINTS = {
+        "m2m": (Settings.URL_M2M, "m2m.xlsx", {"tenant_uuid": Settings.DEFAULT_TENANT_UUID}),
+        "boards": (Settings.URL_DEVICES, "boards.xlsx", None),
+        "kiwi": (Settings.URL_DEVICES2, "kiwi.xlsx", None),
+        "info": (Settings.URL_INFO, "info.xlsx", None),
+        "models": (Settings.URL_MODEL_B, "models.xlsx", None),
+        "software": (Settings.URL_MODEL_K, "software.xlsx", None),
+    }
+
+    def __init__(self, token=None, session=None):
         self.token = token
         self.headers = {'Authorization': f"Basic {self.token}"} if token else {}
+        self.session = session or get_shared_session()
+        self.timeout = (Settings.HTTP_CONNECT_TIMEOUT, Settings.HTTP_READ_TIMEOUT)
 
-    def login(self):
-        """Hace login y devuelve el apiToken"""
-        payload = {"username": Settings.USER, "password": Settings.PASSWORD}
+    def login(self, username=None, password=None):
+        """Hace login y devuelve el apiToken (por defecto con el usuario del .env)"""
+        payload = {"username": username or Settings.USER, "password": password or Settings.PASSWORD}
         try:
-            response = requests.post(Settings.URL_LOGIN, json=payload)
+            response = self.session.post(Settings.URL_LOGIN, json=payload, timeout=self.timeout)
             response.raise_for_status()
             data = response.json()
             if data.get("login") is True:
@@ -22,79 +98,239 @@ class CoreClient:
             print(f"Error login: {e}")
             return None
 
+    def verify_token(self):
+        """
+        Comprueba que el token sigue siendo válido con una petición ligera (catálogo de modelos).
+        Solo se miran las cabeceras: stream=True evita descargar el cuerpo.
+        Devuelve None si la API no responde (no se puede saber si el token es válido).
+        """
+        if not self.token:
+            return False
+        try:
+            response = self.session.get(Settings.URL_MODEL_B, headers=self.headers,
+                                        timeout=self.timeout, stream=True)
+            response.close()
+            return response.ok
+        except requests.exceptions.RequestException as e:
+            print(f"Error validando token: {e}")
+            return None
+
     def get_m2m(self):
-        return self._get_data(Settings.URL_M2M, "m2m.xlsx", params={"tenant_uuid": Settings.DEFAULT_TENANT_UUID})
+        return self._get_named("m2m")
 
     def get_devicesB(self):
-        return self._get_data(Settings.URL_DEVICES, "boards.xlsx")
+        return self._get_named("boards")
 
     def get_devicesKiwi(self):
-        return self._get_data(Settings.URL_DEVICES2, "kiwi.xlsx")
+        return self._get_named("kiwi")
 
     def get_deviceInfo(self):
-        return self._get_data(Settings.URL_INFO, "info.xlsx")
+        return self._get_named("info")
     def get_deviceModels(self):
-        return self._get_data(Settings.URL_MODEL_B, "models.xlsx")
+        return self._get_named("models")
     def get_deviceSoftware(self):
-        return self._get_data(Settings.URL_MODEL_K, "software.xlsx")
+        return self._get_named("software")
 
-# VERIFICACION DE DATOS
-    def _get_data(self, url, filename="output.xlsx", params=None):
+    def get_frame(self, name):
+        """Igual que los getters pero devuelve directamente un DataFrame construido por bloques."""
+        return self._get_named(name, as_frame=True)
+
+    def _pagination(self, name):
+        """Configuración de paginación del endpoint o None si se descarga de una vez."""
+        config = Settings.PAGINATION.get(name)
+        return config if config and config.get("mode") else None
+
+    def _get_named(self, name, raise_errors=False, as_frame=False, extra_params=None):
+        url, filename, params = self.ENDPOINTS[name]
+        if extra_params:
+            params = {**(params or {}), **extra_params}
+        # Etapa por endpoint; dentro quedan desglosadas las etapas http / json de cada petición
+        with stage(f"api.{name}") as s:
+            data = self._get_data(url, filename, params, raise_errors=raise_errors,
+                                  pagination=self._pagination(name), as_frame=as_frame)
+            s.rows = payload_rows(data)
+        return data
+
+# DESCARGA CONCURRENTE
+    def fetch_all(self, names=None, max_workers=None, as_frames=False, extra_params=None):
+        """
+        Descarga varios endpoints en paralelo (por defecto todos los de ENDPOINTS).
+        Devuelve {nombre: {"data": [...], "elapsed": segundos, "error": str | None}},
+        de modo que el tiempo total lo marca el endpoint más lento y no la suma.
+        Con as_frames=True "data" es un DataFrame (construido por bloques si el endpoint pagina).
+        extra_params: {nombre: {param: valor}} que se añaden a la petición de ese endpoint.
+        """
+        names = list(names) if names else list(self.ENDPOINTS)
         if not self.token:
             print("No hay token de sesión. Conéctese primero.")
-            return []
+            empty = pd.DataFrame if as_frames else list
+            return {name: {"data": empty(), "elapsed": 0.0, "error": "Sin token de sesión"} for name in names}
+
+        workers = max_workers or Settings.FETCH_MAX_WORKERS
+        results = {}
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(names)))) as pool:
+            futures = {
+                pool.submit(self._fetch_endpoint, name, as_frames, (extra_params or {}).get(name)): name
+                for name in names
+            }
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+
+        # Mantener el orden pedido por el llamador
+        return {name: results[name] for name in names}
+
+    def _fetch_endpoint(self, name, as_frame=False, extra_params=None):
+        """Descarga un endpoint midiendo su tiempo y capturando el error, sin propagarlo."""
+        start = time.perf_counter()
         try:
-            resp = requests.get(url, headers=self.headers, params=params)
-            resp.raise_for_status() # Esto lanzará un error para códigos 4xx/5xx
+            data = self._get_named(name, raise_errors=True, as_frame=as_frame, extra_params=extra_params)
+            error = None
+        except Exception as e:
+            data = pd.DataFrame() if as_frame else []
+            error = str(e)
+        return {"data": data, "elapsed": time.perf_counter() - start, "error": error}
 
-            data = resp.json()
-            list_data = []
-
-            # Detectar si es dict con lista interna
-            if isinstance(data, dict):
-                # Buscar la primera lista que contenga dicts
-                list_data = None
-                for k, v in data.items():
-                    if isinstance(v, list) and len(v) > 0 and isinstance(v[0], dict):
-                        list_data = v
-                        break
-                if list_data is None:
-                    # Si el dict viene, pero no contiene una lista de dicts (puede que esté vacío)
-                    print(f"Dict recibido para {filename} pero sin lista interna compatible. Claves: {list(data.keys())}")
-                    list_data = []
-            elif isinstance(data, list):
-                list_data = data
+# VERIFICACION DE DATOS
+    def _get_data(self, url, filename="output.xlsx", params=None, raise_errors=False,
+                  pagination=None, as_frame=False):
+        if not self.token:
+            print("No hay token de sesión. Conéctese primero.")
+            return pd.DataFrame() if as_frame else []
+        try:
+            if pagination:
+                # Paginado: nunca tenemos el JSON completo en memoria, solo la página en curso
+                if as_frame:
+                    # Los bloques se unen al final (concat copia una vez las columnas que no son
+                    # texto de Arrow); no se entregan filas antes de tener el endpoint completo
+                    chunks = list(self._iter_chunks(url, params, pagination, filename))
+                    data = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
+                else:
+                    data = [record for page in self._iter_pages(url, params, pagination, filename) for record in page]
             else:
-                print(f"Formato de datos no soportado para {filename}: {type(data)}")
-                list_data = []
+                data = self._request_records(url, params, filename)
+                if as_frame:
+                    data = pd.DataFrame(data)
 
-            # Exportar a Excel
-            if list_data: # Solo intenta exportar si hay datos
-                self._export_columns_to_excel(list_data, filename)
+            # Exportar a disco (opcional y en segundo plano)
+            if len(data): # Solo intenta exportar si hay datos
+                self._export(data, filename)
             else:
-                print(f"La API de {filename} devolvió datos válidos, pero la lista está vacía. No se crea el Excel.")
-                
-            return list_data
-        
+                print(f"La API de {filename} devolvió datos válidos, pero la lista está vacía. No se exporta.")
+
+            return data
+
         # --- Manejo de errores específicos para mejor diagnóstico ---
         except requests.exceptions.HTTPError as http_err:
-            print(f"ERROR HTTP ({resp.status_code}) en {filename} desde {url}: {http_err}")
-            return []
+            status = http_err.response.status_code if http_err.response is not None else "?"
+            print(f"ERROR HTTP ({status}) en {filename} desde {url}: {http_err}")
+            if raise_errors:
+                raise
+            return pd.DataFrame() if as_frame else []
+        except requests.exceptions.Timeout as timeout_err:
+            print(f"TIMEOUT en {filename} desde {url} (límite {self.timeout}s): {timeout_err}")
+            if raise_errors:
+                raise
+            return pd.DataFrame() if as_frame else []
         except requests.exceptions.ConnectionError as conn_err:
             print(f"ERROR DE CONEXIÓN en {filename} desde {url}: {conn_err}")
-            return []
+            if raise_errors:
+                raise
+            return pd.DataFrame() if as_frame else []
         except Exception as e:
             print(f"ERROR DESCONOCIDO en {filename} desde {url}: {e}")
+            if raise_errors:
+                raise
+            return pd.DataFrame() if as_frame else []
+
+    def _request_json(self, url, params=None):
+        with stage("http") as s:
+            resp = self.session.get(url, headers=self.headers, params=params, timeout=self.timeout)
+            resp.raise_for_status() # Esto lanzará un error para códigos 4xx/5xx
+            s.bytes = len(resp.content)
+        with stage("json", nbytes=s.bytes):
+            return resp.json()
+
+    def _request_records(self, url, params=None, filename="output.xlsx"):
+        return self._extract_list(self._request_json(url, params), filename)
+
+    def _extract_list(self, data, filename="output.xlsx"):
+        """Obtiene la lista de registros de la respuesta (lista directa o primera lista de dicts del dict)."""
+        # Detectar si es dict con lista interna
+        if isinstance(data, dict):
+            # Buscar la primera lista que contenga dicts
+            for k, v in data.items():
+                if isinstance(v, list) and len(v) > 0 and isinstance(v[0], dict):
+                    return v
+            # Si el dict viene, pero no contiene una lista de dicts (puede que esté vacío)
+            print(f"Dict recibido para {filename} pero sin lista interna compatible. Claves: {list(data.keys())}")
             return []
+        if isinstance(data, list):
+            return data
+        print(f"Formato de datos no soportado para {filename}: {type(data)}")
+        return []
+
+# PAGINACIÓN
+    def _iter_pages(self, url, params, pagination, filename="output.xlsx"):
+        """
+        Generador de páginas de registros.
+        - mode "page": incrementa page_param hasta recibir una página vacía o, si la respuesta
+          trae el total (total_field, admite 'a.b'), hasta haberlo alcanzado. Una página corta
+          no basta: la API puede limitar `limit` por debajo de page_size.
+        - mode "cursor": sigue el cursor de la respuesta (cursor_field, admite 'a.b') hasta que no venga.
+        """
+        base_params = dict(params or {})
+        page_size = pagination.get("page_size", 1000)
+        base_params[pagination.get("size_param", "limit")] = page_size
+        mode = pagination["mode"]
+
+        page = pagination.get("first_page", 1)
+        cursor = None
+        fetched = 0
+        for _ in range(Settings.PAGINATION_MAX_PAGES):
+            page_params = dict(base_params)
+            if mode == "page":
+                page_params[pagination.get("page_param", "page")] = page
+            elif mode == "cursor":
+                if cursor is not None:
+                    page_params[pagination.get("cursor_param", "cursor")] = cursor
+            else:
+                raise ValueError(f"Modo de paginación no soportado para {filename}: {mode}")
+
+            payload = self._request_json(url, page_params)
+            records = self._extract_list(payload, filename)
+            fetched += len(records)
+            if records:
+                yield records
+
+            if mode == "page":
+                total = _lookup_path(payload, pagination["total_field"]) if pagination.get("total_field") else None
+                if not records or (isinstance(total, (int, float)) and fetched >= total):
+                    return
+                page += 1
+            else:
+                cursor = _lookup_path(payload, pagination.get("cursor_field", "next_cursor"))
+                if not cursor or not records:
+                    return
+        print(f"Aviso: {filename} alcanzó el límite de {Settings.PAGINATION_MAX_PAGES} páginas.")
+
+    def _iter_chunks(self, url, params, pagination, filename="output.xlsx", chunk_rows=None):
+        """Agrupa las páginas en DataFrames de tamaño acotado y libera los dicts crudos de cada bloque."""
+        chunk_rows = chunk_rows or Settings.INGEST_CHUNK_ROWS
+        buffer = []
+        for records in self._iter_pages(url, params, pagination, filename):
+            buffer.extend(records)
+            while len(buffer) >= chunk_rows:
+                yield pd.DataFrame(buffer[:chunk_rows])
+                del buffer[:chunk_rows]
+        if buffer:
+            yield pd.DataFrame(buffer)
 
-#FUNCION EXPORTACION EN EXCEL
-    def _export_columns_to_excel(self, data, filename="output.xlsx"):
-        if not data:
-            print(f"No hay datos para exportar a {filename}")
+#FUNCION EXPORTACION (hilo en segundo plano)
+    def _export(self, data, filename="output.xlsx"):
+        """Encola la exportación si está activada en Settings; nunca bloquea la petición."""
+        if not Settings.EXPORT_ENABLED:
             return
         try:
-            df = pd.DataFrame(data)
-            df.to_excel(filename, index=False)
-            print(f"Datos exportados a {filename}. Columnas: {df.columns.tolist()}")
+            get_export_worker().submit(data, filename)
         except Exception as e:
-            print(f"Error exportando a Excel: {e}")
+            print(f"Error encolando exportación de {filename}: {e}")
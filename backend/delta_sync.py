@@ -0,0 +1,209 @@
+# Archivo: backend/delta_sync.py
+import pandas as pd
+from config.settings import Settings
+from backend.frame_utils import frame_fingerprint, restore_categoricals
+from backend.json_columns import json_value_hashes
+
+
+# Columnas que hash_pandas_object hashea de forma nativa (sin pasar por texto)
+_NATIVE_KINDS = {"string", "integer", "floating", "mixed-integer-float", "decimal", "boolean",
+                 "datetime", "datetime64", "date", "timedelta", "timedelta64", "empty"}
+
+
+def _hashable_column(series):
+    """La columna tal cual si es escalar; las anidadas (dicts/listas) o mezcladas, hash de su JSON canónico."""
+    if series.dtype != object or pd.api.types.infer_dtype(series, skipna=True) in _NATIVE_KINDS:
+        return series
+    return json_value_hashes(series)
+
+
+def row_hashes(df, key):
+    """Hash por registro (indexado por la clave) para detectar cambios entre descargas."""
+    cols = sorted(df.columns)
+    hashable = pd.DataFrame({col: _hashable_column(df[col]) for col in cols}, index=df.index)
+    hashes = pd.util.hash_pandas_object(hashable, index=False)
+    # Índice object (no str de Arrow): isin/reindex entre descargas usan la tabla hash de pandas
+    hashes.index = pd.Index(df[key].astype(str).to_numpy(dtype=object), dtype=object)
+    return hashes
+
+
+class DeltaSync:
+    """
+    Sincronización incremental de un endpoint (boards / kiwi / m2m).
+
+    Guarda la última descarga cruda (hash por registro) y el DataFrame procesado.
+    En cada refresco solo se procesan los registros nuevos o modificados y se
+    parchea el DataFrame procesado, en lugar de recalcularlo entero:
+    - Con `since_param` la API devuelve solo lo cambiado desde la marca de agua, y las
+      descargas completas periódicas se comparan contra la anterior (diff por hash) para
+      detectar bajas sin reprocesar todo.
+    - Sin él, cada descarga completa se procesa entera: hashear la descarga cuesta más que
+      procesarla (ver benchmarks delta_sync_*). `diff_full=True` fuerza el diff igualmente.
+    """
+
+    def __init__(self, name, key, since_param=None, watermark_field=None, full_resync_every=12, diff_full=None):
+        self.name = name
+        self.key = key
+        self.since_param = since_param
+        self.diff_full = bool(since_param) if diff_full is None else diff_full
+        self.watermark_field = watermark_field
+        self.full_resync_every = full_resync_every
+        self.reset()
+
+    def reset(self):
+        """Olvida el estado: el siguiente refresco procesa todo de nuevo."""
+        self.hashes = None
+        self.processed = None
+        self.watermark = None
+        self._syncs_since_full = 0
+        self.last_stats = {}
+
+    def request_params(self):
+        """Parámetros extra para pedir solo los cambios (modo marca de agua)."""
+        if not self.since_param or self.watermark is None or self.processed is None or self.hashes is None:
+            return {}
+        if self._syncs_since_full >= self.full_resync_every:
+            # Periódicamente pedimos todo: el modo marca de agua no detecta bajas
+            return {}
+        return {self.since_param: self.watermark}
+
+    def apply(self, raw, processor, is_partial=False):
+        """
+        Incorpora una descarga y devuelve el DataFrame procesado actualizado.
+        `processor(raw_df) -> processed_df` es prepare_boards / prepare_kiwi / process_m2m.
+        `is_partial` indica que `raw` solo contiene cambios (se pidió con request_params()).
+        """
+        raw = raw if isinstance(raw, pd.DataFrame) else pd.DataFrame(raw)
+
+        if raw.empty and self.processed is not None:
+            # Descarga vacía: no hay columna clave que hashear
+            return self._apply_empty(is_partial)
+
+        if not self._can_diff(raw, is_partial):
+            return self._full(raw, processor)
+
+        new_hashes = row_hashes(raw, self.key)
+        if not new_hashes.index.is_unique:
+            return self._full(raw, processor)
+
+        # Nuevos = clave desconocida; modificados = clave conocida con hash distinto
+        known = new_hashes.index.isin(self.hashes.index)
+        changed_mask = ~known
+        changed_mask[known] = self.hashes.reindex(new_hashes.index[known]).to_numpy() != new_hashes.to_numpy()[known]
+        changed_keys = new_hashes.index[changed_mask]
+        removed_keys = pd.Index([]) if is_partial else self.hashes.index.difference(new_hashes.index)
+
+        keys = self.processed[self.key].astype(str)
+        drop_mask = keys.isin(changed_keys) | keys.isin(removed_keys)
+
+        if len(changed_keys):
+            delta = processor(raw.loc[changed_mask].reset_index(drop=True))
+            patched = pd.concat([self.processed.loc[~drop_mask.to_numpy()], delta], ignore_index=True)
+            # concat de categorías distintas degrada a object: se recupera el dtype compacto
+            patched = restore_categoricals(patched, like=self.processed)
+        elif drop_mask.any():
+            patched = self.processed.loc[~drop_mask.to_numpy()].reset_index(drop=True)
+        else:
+            patched = self.processed
+
+        if is_partial:
+            self.hashes = pd.concat([self.hashes.drop(changed_keys, errors="ignore"), new_hashes[changed_mask]])
+            self._syncs_since_full += 1
+        else:
+            self.hashes = new_hashes
+            # Conservamos el orden de la API para que las tablas no "salten" entre refrescos
+            if len(changed_keys) or len(removed_keys):
+                order = pd.Index(new_hashes.index)
+                patched = patched.set_index(patched[self.key].astype(str)).reindex(order).reset_index(drop=True)
+            self._syncs_since_full = 0
+
+        self.processed = patched
+        self._update_watermark(raw)
+        self.last_stats = {
+            "mode": "parcial" if is_partial else "diff",
+            "changed": int(len(changed_keys)),
+            "removed": int(len(removed_keys)),
+            "total": int(len(patched)),
+        }
+        return patched
+
+    def _apply_empty(self, is_partial):
+        if is_partial:
+            # Marca de agua sin cambios (lo normal entre refrescos): se mantiene lo que había
+            self._syncs_since_full += 1
+            self.last_stats = {"mode": "parcial", "changed": 0, "removed": 0, "total": int(len(self.processed))}
+            return self.processed
+        # Descarga completa vacía: la flota ya no tiene registros
+        empty = self.processed.iloc[0:0]
+        removed = len(self.processed)
+        self.hashes = None
+        self.processed = None
+        self._syncs_since_full = 0
+        self.last_stats = {"mode": "completo", "changed": 0, "removed": int(removed), "total": 0}
+        return empty
+
+    def _can_diff(self, raw, is_partial):
+        if not (is_partial or self.diff_full):
+            return False
+        if self.processed is None or self.hashes is None:
+            return False
+        return self.key in raw.columns and self.key in self.processed.columns
+
+    def _full(self, raw, processor):
+        processed = processor(raw)
+        if self.key in raw.columns and not raw.empty:
+            self.hashes = row_hashes(raw, self.key) if self.diff_full else None
+            self.processed = processed
+        else:
+            self.hashes = None
+            self.processed = None
+        self._syncs_since_full = 0
+        self._update_watermark(raw)
+        self.last_stats = {"mode": "completo", "changed": int(len(raw)), "removed": 0, "total": int(len(processed))}
+        return processed
+
+    def _update_watermark(self, raw):
+        if self.watermark_field and self.watermark_field in raw.columns and not raw.empty:
+            latest = raw[self.watermark_field].dropna().astype(str).max()
+            if isinstance(latest, str) and (self.watermark is None or latest > self.watermark):
+                self.watermark = latest
+
+
+class FleetSync:
+    """Estado incremental de todos los endpoints sincronizables de un tenant."""
+
+    def __init__(self, config=None):
+        config = Settings.DELTA_SYNC if config is None else config
+        self.endpoints = {name: DeltaSync(name, **opts) for name, opts in config.items()}
+        self.catalog_fingerprint = None
+
+    def request_params(self):
+        """{endpoint: params extra} para los endpoints que admiten pedir solo cambios."""
+        params = {}
+        for name, sync in self.endpoints.items():
+            extra = sync.request_params()
+            if extra:
+                params[name] = extra
+        return params
+
+    def check_catalog(self, df_models, df_soft):
+        """Si cambia el catálogo de modelos/software hay que reprocesar boards y kiwi completos."""
+        fingerprint = (frame_fingerprint(df_models), frame_fingerprint(df_soft))
+        if fingerprint != self.catalog_fingerprint:
+            for name in ("boards", "kiwi"):
+                if name in self.endpoints:
+                    self.endpoints[name].reset()
+            self.catalog_fingerprint = fingerprint
+
+    def apply(self, name, raw, processor, is_partial=False):
+        if name not in self.endpoints:
+            return processor(raw)
+        return self.endpoints[name].apply(raw, processor, is_partial=is_partial)
+
+    def stats(self):
+        return {name: sync.last_stats for name, sync in self.endpoints.items() if sync.last_stats}
+
+    def reset(self):
+        for sync in self.endpoints.values():
+            sync.reset()
+        self.catalog_fingerprint = None
@@ -0,0 +1,131 @@
+# Archivo: backend/export_worker.py
+import gzip
+import json
+import os
+import queue
+import threading
+import pandas as pd
+from config.settings import Settings
+from backend.instrumentation import stage
+
+# Extensión de fichero por formato de exportación
+EXTENSIONS = {
+    "xlsx": ".xlsx",
+    "parquet": ".parquet",
+    "feather": ".feather",
+    "jsonl.gz": ".jsonl.gz",
+}
+
+
+def _to_frame(data):
+    return data if isinstance(data, pd.DataFrame) else pd.DataFrame(data)
+
+
+def _write_xlsx(data, path):
+    _to_frame(data).to_excel(path, index=False)
+
+
+def _stringify_nested(df):
+    """Arrow no admite columnas con dicts/listas mezclados: se guardan como texto JSON."""
+    df = df.copy()
+    for col in df.columns[df.dtypes == object]:
+        if df[col].map(lambda v: isinstance(v, (dict, list))).any():
+            df[col] = df[col].map(lambda v: json.dumps(v, default=str) if isinstance(v, (dict, list)) else v)
+    return df
+
+
+def _write_parquet(data, path):
+    _stringify_nested(_to_frame(data)).to_parquet(path, index=False)
+
+
+def _write_feather(data, path):
+    _stringify_nested(_to_frame(data)).reset_index(drop=True).to_feather(path)
+
+
+def _write_jsonl_gz(data, path):
+    # No necesita DataFrame: los registros se escriben tal cual llegan de la API
+    records = data.to_dict(orient="records") if isinstance(data, pd.DataFrame) else data
+    with gzip.open(path, "wt", encoding="utf-8", compresslevel=3) as fh:
+        for record in records:
+            fh.write(json.dumps(record, ensure_ascii=False, default=str))
+            fh.write("\n")
+
+
+WRITERS = {
+    "xlsx": _write_xlsx,
+    "parquet": _write_parquet,
+    "feather": _write_feather,
+    "jsonl.gz": _write_jsonl_gz,
+}
+
+
+def export_path(filename, fmt, export_dir=None):
+    """'boards.xlsx' + 'parquet' -> '<export_dir>/boards.parquet'"""
+    base = os.path.basename(filename).split(".")[0] or "output"
+    return os.path.join(export_dir or Settings.EXPORT_DIR, base + EXTENSIONS[fmt])
+
+
+class ExportWorker:
+    """
+    Escritor en segundo plano: CoreClient encola los datos y un hilo daemon los
+    serializa a disco, así la carga del dashboard nunca espera a la exportación.
+    Si un mismo fichero se encola varias veces antes de escribirse, solo se
+    escribe la versión más reciente.
+    """
+
+    def __init__(self, fmt=None, export_dir=None):
+        self.fmt = fmt or Settings.EXPORT_FORMAT
+        if self.fmt not in WRITERS:
+            raise ValueError(f"Formato de exportación no soportado: {self.fmt}. Opciones: {list(WRITERS)}")
+        self.export_dir = export_dir or Settings.EXPORT_DIR
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._thread = None
+
+    def submit(self, data, filename):
+        """Encola una exportación y vuelve inmediatamente."""
+        if data is None or len(data) == 0:
+            print(f"No hay datos para exportar a {filename}")
+            return
+        with self._lock:
+            already_queued = filename in self._pending
+            self._pending[filename] = data
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="export-worker", daemon=True)
+                self._thread.start()
+        if not already_queued:
+            self._queue.put(filename)
+
+    def flush(self):
+        """Bloquea hasta que se hayan escrito todas las exportaciones pendientes."""
+        self._queue.join()
+
+    def _run(self):
+        while True:
+            filename = self._queue.get()
+            try:
+                with self._lock:
+                    data = self._pending.pop(filename, None)
+                if data is not None:
+                    path = export_path(filename, self.fmt, self.export_dir)
+                    with stage(f"export.{self.fmt}", rows=len(data)):
+                        WRITERS[self.fmt](data, path)
+                    print(f"Datos exportados a {path} ({len(data)} registros)")
+            except Exception as e:
+                print(f"Error exportando {filename} a {self.fmt}: {e}")
+            finally:
+                self._queue.task_done()
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def get_export_worker():
+    """Worker único por proceso (se crea la primera vez que se exporta)."""
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = ExportWorker()
+        return _worker
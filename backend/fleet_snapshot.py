@@ -0,0 +1,334 @@
+# Archivo: backend/fleet_snapshot.py
+import hashlib
+import threading
+import time
+import pandas as pd
+from config.settings import Settings
+from backend.M2M.data_m2m import process_m2m
+from backend.M2M.m2m_cube import build_m2m_cube
+from backend.Device.data_device import prepare_boards, prepare_kiwi
+from backend.Info.data_info import process_devicesInfo
+from backend.delta_sync import FleetSync
+from backend.frame_utils import memory_report
+from backend.instrumentation import instrumented
+
+
+# Endpoints cuyo procesado depende del catálogo: si se refresca el catálogo hay que reprocesarlos
+CATALOG_DEPENDENTS = {"models": ("boards", "kiwi"), "software": ("boards", "kiwi")}
+# Y al revés: lo que hace falta tener para poder procesar cada endpoint
+ENDPOINT_REQUIREMENTS = {"boards": ("models", "software"), "kiwi": ("models", "software")}
+
+
+class FleetSnapshot:
+    """Foto de la flota: DataFrames ya procesados + metadatos de la descarga."""
+
+    def __init__(self, frames, timings=None, errors=None, created_at=None):
+        self.frames = frames
+        self.timings = timings or {}
+        self.errors = errors or {}
+        self.created_at = created_at if created_at is not None else time.time()
+        self.refreshed_at = {}  # {endpoint: instante de la última descarga correcta}
+        self.sync_stats = {}
+        self.memory = {}
+        self.origin = "api"  # "disco" si se ha cargado de SnapshotStore
+        self.version = None
+
+    def age(self):
+        """Segundos transcurridos desde que se generó la foto."""
+        return time.time() - self.created_at
+
+    def is_expired(self, ttl):
+        return ttl is not None and ttl >= 0 and self.age() > ttl
+
+    def all_failed(self):
+        """True si han fallado todos los endpoints (la foto no tiene datos útiles)."""
+        return bool(self.errors) and len(self.errors) >= len(self.timings)
+
+    def missing(self, names):
+        """Endpoints de `names` que aún no se han cargado en esta foto (carga por pestaña)."""
+        return [name for name in names or () if name not in self.frames]
+
+
+def _with_dependents(names, loaded):
+    # Solo se reprocesan los dependientes que ya estaban cargados
+    names = list(names)
+    for name in list(names):
+        for dependent in CATALOG_DEPENDENTS.get(name, ()):
+            if dependent in loaded and dependent not in names:
+                names.append(dependent)
+    return names
+
+
+def _with_requirements(names, loaded):
+    names = list(names)
+    for name in list(names):
+        for required in ENDPOINT_REQUIREMENTS.get(name, ()):
+            if required not in loaded and required not in names:
+                names.append(required)
+    return names
+
+
+@instrumented("snapshot.build")
+def build_fleet_snapshot(client, sync=None, names=None, previous=None):
+    """
+    Descarga los endpoints (en paralelo) y procesa los DataFrames de la flota.
+    Con `sync` (FleetSync) boards/kiwi/m2m se actualizan de forma incremental:
+    solo se reprocesan los registros nuevos o modificados desde la foto anterior.
+    Con `names` solo se descargan esos endpoints (más el catálogo si hace falta para procesarlos)
+    y el resto de DataFrames se reutiliza de `previous` (refresco por endpoint del FleetRefresher
+    y carga por pestaña). Los endpoints que no estén en ninguna de las dos no aparecen en la foto.
+    """
+    previous_frames = previous.frames if previous is not None else {}
+    if names is None:
+        names = list(client.ENDPOINTS)
+    else:
+        names = _with_requirements(_with_dependents(names, previous_frames), previous_frames)
+
+    extra_params = sync.request_params() if sync is not None else {}
+    extra_params = {name: params for name, params in extra_params.items() if name in names}
+    # as_frames: los endpoints paginados se construyen por bloques sin retener el JSON completo
+    results = client.fetch_all(names=names, as_frames=True, extra_params=extra_params)
+    raw = {name: res["data"] for name, res in results.items()}
+
+    # Endpoints con datos en esta foto: los descargados ahora y los heredados de la anterior
+    available = set(results) | set(previous_frames)
+
+    def keep_previous(name):
+        # Endpoint no refrescado, o con error teniendo datos de la foto anterior
+        if name not in results:
+            return True
+        return bool(results[name]["error"]) and name in previous_frames
+
+    def catalog(name):
+        if keep_previous(name):
+            return previous_frames.get(name, pd.DataFrame())
+        return pd.DataFrame(raw[name])
+
+    # 1. DataFrames auxiliares (modelos y software)
+    try:
+        df_models = catalog("models")
+        df_soft = catalog("software")
+    except Exception as e:
+        print(f"Error creando DFs auxiliares: {e}")
+        df_models = pd.DataFrame()
+        df_soft = pd.DataFrame()
+
+    processors = {
+        "m2m": process_m2m,
+        "boards": lambda data: prepare_boards(data, df_models=df_models, df_soft=df_soft),
+        "kiwi": lambda data: prepare_kiwi(data, df_models=df_models, df_soft=df_soft),
+    }
+
+    # 2. Dispositivos enriquecidos con modelos/software + M2M
+    frames = {}
+    if sync is None:
+        for name, processor in processors.items():
+            if name in available:
+                frames[name] = previous_frames[name] if keep_previous(name) else processor(raw[name])
+    else:
+        if "models" in results or "software" in results:
+            sync.check_catalog(df_models, df_soft)
+        for name, processor in processors.items():
+            if name not in available:
+                continue
+            previous_processed = sync.endpoints[name].processed if name in sync.endpoints else None
+            if name not in results:
+                frames[name] = previous_frames[name]
+            elif results[name]["error"] and previous_processed is not None:
+                # Si el endpoint falla mantenemos los datos de la foto anterior
+                frames[name] = previous_processed
+            else:
+                frames[name] = sync.apply(name, raw[name], processor, is_partial=name in extra_params)
+
+    # 3. Info + catálogos
+    if "info" in available:
+        frames["info"] = previous_frames["info"] if keep_previous("info") else process_devicesInfo(raw["info"])
+    if "models" in available:
+        frames["models"] = df_models
+    if "software" in available:
+        frames["software"] = df_soft
+
+    # 4. Rollups: el cubo de M2M solo se recalcula si ha cambiado el DataFrame de M2M
+    if "m2m" in frames:
+        if "m2m_cube" in previous_frames and frames["m2m"] is previous_frames.get("m2m"):
+            frames["m2m_cube"] = previous_frames["m2m_cube"]
+        else:
+            frames["m2m_cube"] = build_m2m_cube(frames["m2m"])
+
+    timings = dict(previous.timings) if previous is not None else {}
+    errors = {name: err for name, err in (previous.errors if previous is not None else {}).items()
+              if name not in results}
+    for name, res in results.items():
+        timings[name] = res["elapsed"]
+        if res["error"]:
+            errors[name] = res["error"]
+
+    snapshot = FleetSnapshot(frames, timings=timings, errors=errors)
+    snapshot.refreshed_at = dict(previous.refreshed_at) if previous is not None else {}
+    for name, res in results.items():
+        if not res["error"]:
+            snapshot.refreshed_at[name] = snapshot.created_at
+    if sync is not None:
+        snapshot.sync_stats = sync.stats()
+    snapshot.memory = {name: memory_report(df) for name, df in frames.items()}
+    return snapshot
+
+
+class SnapshotCache:
+    """
+    Caché en memoria de FleetSnapshot con TTL, compartida por todas las sesiones del proceso.
+    La clave es el tenant: diez sesiones abiertas sobre la misma flota comparten una sola copia
+    de los DataFrames y una sola descarga (single-flight).
+    La autorización sigue siendo por sesión: cada token se valida contra la API (authorize)
+    antes de servirle datos, y la validación se recuerda TOKEN_CHECK_TTL segundos.
+    """
+
+    def __init__(self, ttl=None, token_ttl=None):
+        self.ttl = Settings.SNAPSHOT_TTL_SECONDS if ttl is None else ttl
+        self.token_ttl = Settings.TOKEN_CHECK_TTL_SECONDS if token_ttl is None else token_ttl
+        self._entries = {}
+        self._syncs = {}
+        self._build_locks = {}
+        self._verified = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(tenant_uuid=None):
+        return tenant_uuid or Settings.DEFAULT_TENANT_UUID
+
+    @staticmethod
+    def _token_hash(token):
+        # El token nunca se guarda en claro
+        return hashlib.sha256(str(token).encode("utf-8")).hexdigest()
+
+    # --- AUTORIZACIÓN POR SESIÓN ---
+    def authorize(self, token, key, verifier):
+        """
+        True si el token puede ver los datos del tenant `key`.
+        `verifier()` comprueba el token contra la API (CoreClient.verify_token); el resultado
+        positivo se recuerda durante token_ttl para no repetir la llamada en cada rerun.
+        Si la API no responde (verifier() devuelve None) se acepta un token ya validado
+        antes, para poder seguir consultando las fotos guardadas sin conexión.
+        """
+        if not token:
+            return False
+        entry = (self._token_hash(token), key)
+        now = time.time()
+        with self._lock:
+            verified_at = self._verified.get(entry)
+            if verified_at is not None and now - verified_at <= self.token_ttl:
+                return True
+        valid = verifier()
+        if valid is None:
+            return verified_at is not None
+        if not valid:
+            with self._lock:
+                self._verified.pop(entry, None)
+            return False
+        with self._lock:
+            self._verified[entry] = time.time()
+        return True
+
+    def revoke(self, token):
+        """Olvida las validaciones de un token (cierre de sesión)."""
+        token_hash = self._token_hash(token)
+        with self._lock:
+            for entry in [e for e in self._verified if e[0] == token_hash]:
+                del self._verified[entry]
+
+    # --- FOTOS DE DATOS ---
+    def get(self, key):
+        """Devuelve la foto vigente o None si no existe / ha caducado."""
+        with self._lock:
+            snapshot = self._entries.get(key)
+            if snapshot is None:
+                return None
+            if snapshot.is_expired(self.ttl):
+                del self._entries[key]
+                return None
+            return snapshot
+
+    def latest(self, key):
+        """Última foto disponible aunque haya superado el TTL (la mantiene al día el FleetRefresher)."""
+        with self._lock:
+            return self._entries.get(key)
+
+    def put(self, key, snapshot):
+        # Si han fallado todos los endpoints no cacheamos: el siguiente rerun reintenta
+        if snapshot.all_failed():
+            return snapshot
+        with self._lock:
+            self._entries[key] = snapshot
+        return snapshot
+
+    def get_or_build(self, key, builder, names=None, stale_ok=False, on_built=None):
+        """
+        Foto vigente o, si no hay, la construye con `builder(previous, names)`.
+        Con `names` basta con que la foto tenga esos endpoints: si falta alguno se descargan
+        solo los que faltan (builder(foto_actual, faltan)) y se añaden a la foto vigente,
+        sin renovar su caducidad. Con stale_ok se parte de latest() aunque haya caducado
+        (la mantiene al día el FleetRefresher).
+        `on_built(foto)` se llama con la foto ya publicada y definitiva (p.ej. para guardarla
+        en disco); no se llama si no se ha construido nada.
+        Single-flight: si otra sesión ya está descargando este tenant se espera a su
+        resultado en lugar de lanzar una segunda descarga.
+        """
+        current = self.latest if stale_ok else self.get
+        snapshot = current(key)
+        if snapshot is not None and not snapshot.missing(names):
+            return snapshot
+        with self._build_lock(key):
+            # Quien esperaba el lock encuentra ya la foto que ha dejado la otra sesión
+            snapshot = current(key)
+            if snapshot is not None and not snapshot.missing(names):
+                return snapshot
+            if snapshot is None:
+                built = builder(None, names)
+            else:
+                built = builder(snapshot, snapshot.missing(names))
+                built.created_at = snapshot.created_at
+            snapshot = self.put(key, built)
+            if on_built is not None:
+                on_built(snapshot)
+        return snapshot
+
+    def refresh(self, key, builder):
+        """
+        Construye una foto nueva y la publica de golpe: los lectores ven la anterior hasta
+        que la nueva está completa. Comparte el lock de get_or_build, así que nunca hay
+        dos descargas simultáneas del mismo tenant.
+        """
+        with self._build_lock(key):
+            return self.put(key, builder(self.latest(key)))
+
+    def _build_lock(self, key):
+        with self._lock:
+            return self._build_locks.setdefault(key, threading.Lock())
+
+    def get_sync(self, key):
+        """Estado de sincronización incremental asociado a la clave (None si está desactivada)."""
+        if not Settings.DELTA_SYNC_ENABLED:
+            return None
+        with self._lock:
+            if key not in self._syncs:
+                self._syncs[key] = FleetSync()
+            return self._syncs[key]
+
+    def invalidate(self, key=None, reset_sync=False):
+        """
+        Invalida una clave concreta o toda la caché si key es None.
+        Con reset_sync=True se descarta también el estado incremental (próxima carga completa).
+        """
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                if reset_sync:
+                    self._syncs.clear()
+            else:
+                self._entries.pop(key, None)
+                if reset_sync:
+                    self._syncs.pop(key, None)
+
+
+# Instancia compartida por todas las sesiones del servidor
+snapshot_cache = SnapshotCache()
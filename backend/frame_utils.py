@@ -0,0 +1,73 @@
+# Archivo: backend/frame_utils.py
+import pandas as pd
+from config.settings import Settings
+
+# pyarrow es opcional: solo se usa si Settings.USE_PYARROW_STRINGS está activo
+try:
+    import pyarrow  # noqa: F401
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+
+def compact_frame(df, categorical=()):
+    """
+    Reduce la huella en memoria de un DataFrame procesado:
+    - Columnas de baja cardinalidad (estado, organización, modelo...) -> category.
+    - Enteros -> el tipo entero más pequeño que los contenga.
+    - Opcionalmente, el resto de columnas de texto -> string[pyarrow].
+    Modifica y devuelve el mismo DataFrame.
+    """
+    if not Settings.COMPACT_FRAMES or df.empty:
+        return df
+
+    for col in categorical:
+        if col not in df.columns or isinstance(df[col].dtype, pd.CategoricalDtype):
+            continue
+        if df[col].nunique(dropna=False) <= max(1, len(df) * Settings.CATEGORY_MAX_RATIO):
+            df[col] = df[col].astype("category")
+
+    for col in df.select_dtypes(include=["integer"]).columns:
+        df[col] = pd.to_numeric(df[col], downcast="integer")
+
+    if Settings.USE_PYARROW_STRINGS and HAS_PYARROW:
+        for col in df.columns:
+            if df[col].dtype == object and _is_text(df[col]):
+                df[col] = df[col].astype("string[pyarrow]")
+
+    return df
+
+
+def restore_categoricals(df, like):
+    """Tras un concat, vuelve a convertir a category las columnas que lo eran en `like`."""
+    for col in like.columns:
+        if col in df.columns and isinstance(like[col].dtype, pd.CategoricalDtype) \
+                and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("category")
+    return df
+
+
+def frame_fingerprint(df):
+    """Huella de un DataFrame completo (p.ej. catálogo de modelos/software)."""
+    if df is None or df.empty:
+        return None
+    return int(pd.util.hash_pandas_object(df[sorted(df.columns)].astype(str), index=False).sum())
+
+
+def memory_report(df):
+    """Resumen de memoria de un DataFrame: filas, columnas, MB totales y las columnas más pesadas."""
+    if df is None or df.empty:
+        return {"rows": 0, "columns": 0, "mb": 0.0, "top_columns": {}}
+    usage = df.memory_usage(deep=True, index=True)
+    top = usage.drop("Index", errors="ignore").sort_values(ascending=False).head(5)
+    return {
+        "rows": len(df),
+        "columns": df.shape[1],
+        "mb": round(float(usage.sum()) / 1_048_576, 2),
+        "top_columns": {col: round(float(val) / 1_048_576, 2) for col, val in top.items()},
+    }
+
+
+def _is_text(series):
+    sample = series.dropna().head(100)
+    return not sample.empty and all(isinstance(v, str) for v in sample)
@@ -0,0 +1,173 @@
+# Archivo: backend/instrumentation.py
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+import pandas as pd
+from config.settings import Settings
+
+_local = threading.local()
+
+
+def payload_rows(value):
+    """Nº de filas de un resultado típico (DataFrame, lista de registros...); None si no aplica."""
+    if isinstance(value, (pd.DataFrame, pd.Series, list, tuple)):
+        return len(value)
+    return None
+
+
+class StageHandle:
+    """Lo que ve el código dentro de un `with stage(...)`: puede anotar filas y bytes."""
+
+    __slots__ = ("name", "rows", "bytes")
+
+    def __init__(self, name):
+        self.name = name
+        self.rows = None
+        self.bytes = None
+
+
+class StageRecorder:
+    """
+    Registro en memoria de etapas (descarga HTTP, decodificación JSON, procesado, vistas...):
+    tiempo de pared, filas y bytes. Guarda agregados por etapa y las últimas N mediciones.
+    Compartido por el proceso y seguro entre hilos (fetch_all, refresco y exportación usan hilos).
+    """
+
+    def __init__(self, max_events=500):
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._events = deque(maxlen=max_events)
+
+    def record(self, name, seconds, rows=None, nbytes=None, error=None):
+        event = {"stage": name, "ts": time.time(), "seconds": seconds, "rows": rows, "bytes": nbytes}
+        if error:
+            event["error"] = error
+        with self._lock:
+            stats = self._stats.setdefault(name, {
+                "calls": 0, "errors": 0, "total_s": 0.0, "max_s": 0.0, "last_s": 0.0,
+                "last_rows": None, "last_bytes": None, "total_bytes": 0,
+            })
+            stats["calls"] += 1
+            stats["errors"] += 1 if error else 0
+            stats["total_s"] += seconds
+            stats["max_s"] = max(stats["max_s"], seconds)
+            stats["last_s"] = seconds
+            if rows is not None:
+                stats["last_rows"] = rows
+            if nbytes is not None:
+                stats["last_bytes"] = nbytes
+                stats["total_bytes"] += nbytes
+            self._events.append(event)
+        if Settings.INSTRUMENTATION_LOG:
+            # Log estructurado: una línea JSON por etapa
+            print(json.dumps(event, ensure_ascii=False, default=str))
+
+    def summary(self):
+        """DataFrame con una fila por etapa, ordenado por tiempo total."""
+        with self._lock:
+            rows = [{"stage": name, **stats} for name, stats in self._stats.items()]
+        if not rows:
+            return pd.DataFrame(columns=["stage", "calls", "errors", "total_s", "mean_s", "max_s",
+                                         "last_s", "last_rows", "last_bytes", "total_bytes"])
+        df = pd.DataFrame(rows)
+        df["mean_s"] = df["total_s"] / df["calls"]
+        return df.sort_values("total_s", ascending=False).reset_index(drop=True)
+
+    def events(self):
+        with self._lock:
+            return list(self._events)
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._events.clear()
+
+    def prometheus_text(self, prefix="dashboard_stage"):
+        """Métricas en formato texto de Prometheus (node_exporter textfile collector o /metrics)."""
+        with self._lock:
+            items = sorted(self._stats.items())
+        lines = [
+            f"# HELP {prefix}_seconds_total Tiempo acumulado por etapa.",
+            f"# TYPE {prefix}_seconds_total counter",
+        ]
+        lines += [f'{prefix}_seconds_total{{stage="{name}"}} {s["total_s"]:.6f}' for name, s in items]
+        lines += [f"# HELP {prefix}_calls_total Ejecuciones por etapa.", f"# TYPE {prefix}_calls_total counter"]
+        lines += [f'{prefix}_calls_total{{stage="{name}"}} {s["calls"]}' for name, s in items]
+        lines += [f"# HELP {prefix}_errors_total Ejecuciones con error por etapa.", f"# TYPE {prefix}_errors_total counter"]
+        lines += [f'{prefix}_errors_total{{stage="{name}"}} {s["errors"]}' for name, s in items]
+        lines += [f"# HELP {prefix}_last_seconds Duración de la última ejecución.", f"# TYPE {prefix}_last_seconds gauge"]
+        lines += [f'{prefix}_last_seconds{{stage="{name}"}} {s["last_s"]:.6f}' for name, s in items]
+        lines += [f"# HELP {prefix}_last_rows Filas de la última ejecución.", f"# TYPE {prefix}_last_rows gauge"]
+        lines += [f'{prefix}_last_rows{{stage="{name}"}} {s["last_rows"]}' for name, s in items
+                  if s["last_rows"] is not None]
+        lines += [f"# HELP {prefix}_bytes_total Bytes de payload acumulados.", f"# TYPE {prefix}_bytes_total counter"]
+        lines += [f'{prefix}_bytes_total{{stage="{name}"}} {s["total_bytes"]}' for name, s in items
+                  if s["last_bytes"] is not None]
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path=None):
+        """Escribe las métricas en Settings.METRICS_FILE (o `path`) de forma atómica."""
+        path = path or Settings.METRICS_FILE
+        if not path:
+            return None
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            fh.write(self.prometheus_text())
+        os.replace(tmp, path)
+        return path
+
+
+# Registro compartido por todo el proceso
+recorder = StageRecorder()
+
+
+class stage:
+    """
+    Mide una etapa: `with stage("m2m.process") as s: ...; s.rows = len(df)`.
+    Las etapas anidadas en el mismo hilo se nombran con la ruta completa
+    ("api.boards/http", "api.boards/json"), así se ve qué parte pesa dentro de cada una.
+    """
+
+    def __init__(self, name, rows=None, nbytes=None):
+        self.handle = StageHandle(name)
+        self.handle.rows = rows
+        self.handle.bytes = nbytes
+        self._start = None
+        self._full_name = name
+
+    def __enter__(self):
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        self._full_name = f"{stack[-1]}/{self.handle.name}" if stack else self.handle.name
+        stack.append(self._full_name)
+        self._start = time.perf_counter()
+        return self.handle
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self._start
+        _local.stack.pop()
+        if Settings.INSTRUMENTATION_ENABLED:
+            recorder.record(self._full_name, elapsed, rows=self.handle.rows, nbytes=self.handle.bytes,
+                            error=exc_type.__name__ if exc_type else None)
+        return False
+
+
+def instrumented(name=None):
+    """Decorador: mide cada llamada como una etapa y anota las filas del resultado."""
+    def decorator(func):
+        stage_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not Settings.INSTRUMENTATION_ENABLED:
+                return func(*args, **kwargs)
+            with stage(stage_name) as s:
+                result = func(*args, **kwargs)
+                s.rows = payload_rows(result)
+            return result
+        return wrapper
+    return decorator
@@ -0,0 +1,155 @@
+# Archivo: backend/json_columns.py
+import ast
+import json
+import threading
+from collections import Counter
+import numpy as np
+import pandas as pd
+
+# orjson es opcional: si está instalado se usa como decodificador (varias veces más rápido)
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_loads = orjson.loads if orjson is not None else json.loads
+
+
+def _dumps_sorted(value):
+    """JSON con claves ordenadas (texto canónico de un dict/lista)."""
+    return json.dumps(value, sort_keys=True, default=str)
+
+
+# Fallos de parseo acumulados por columna (visible en diagnóstico en lugar de perderse como None)
+_failures = Counter()
+_failures_lock = threading.Lock()
+
+
+def _decode(text):
+    """
+    Decodifica un string JSON. Si falla y usa comillas simples (típico del Excel: repr de Python
+    con True/False/None) lo lee como literal de Python y, si tampoco, cambia las comillas por
+    dobles. Lanza ValueError si no es JSON válido.
+    """
+    try:
+        return _loads(text)
+    except ValueError:
+        if "'" not in text:
+            raise
+    try:
+        value = ast.literal_eval(text)
+    except (ValueError, SyntaxError, TypeError, MemoryError, RecursionError):
+        value = None
+    if isinstance(value, (dict, list)):
+        return value
+    return _loads(text.replace("'", '"'))
+
+
+def safe_json(x, column=None):
+    """Convierte strings JSON a dict/list. Dicts y listas nativos se devuelven tal cual. Si falla → None"""
+    if isinstance(x, (dict, list)):
+        return x
+    if isinstance(x, str):
+        if not x.strip():
+            return None
+        try:
+            return _decode(x)
+        except ValueError:
+            if column is not None:
+                _record_failures(column, 1)
+            return None
+    return None
+
+
+def decode_json_column(series, column=None):
+    """
+    Parsea una columna entera de JSON:
+    - Camino rápido: si la API ya devuelve dicts/listas no se decodifica nada.
+    - Cada string distinto se decodifica una sola vez (los blobs 'info' se repiten mucho).
+      Las filas con el mismo texto comparten el mismo objeto: tratarlo como solo lectura.
+    - Los fallos se cuentan por columna (ver get_parse_failures()).
+    """
+    column = column or series.name or "?"
+    values = series.tolist()
+    cache = {}
+    failures = 0
+    out = []
+    append = out.append
+    for value in values:
+        kind = type(value)
+        if kind is dict or kind is list:
+            append(value)
+        elif kind is str:
+            if value in cache:
+                append(cache[value])
+                continue
+            if not value.strip():
+                parsed = None
+            else:
+                try:
+                    parsed = _decode(value)
+                except ValueError:
+                    parsed = None
+                    failures += 1
+            cache[value] = parsed
+            append(parsed)
+        else:
+            append(None)
+
+    if failures:
+        _record_failures(column, failures)
+        print(f"Aviso: {failures} valores JSON inválidos en la columna '{column}'")
+    return pd.Series(out, index=series.index, dtype=object)
+
+
+def json_value_hashes(series):
+    """
+    Hash (int64) de cada valor de una columna anidada o con tipos mezclados, a partir de su
+    JSON con claves ordenadas: dos dicts iguales dan siempre el mismo hash.
+    Usa hash() de Python, así que solo es comparable dentro del mismo proceso.
+    Los objetos compartidos entre filas (ver decode_json_column) se serializan una sola vez.
+    """
+    if orjson is not None:
+        dumps, option = orjson.dumps, orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+        try:
+            return _value_hashes(series, lambda value: dumps(value, option=option, default=str))
+        except TypeError:
+            # Enteros fuera de rango u otros tipos que orjson no serializa
+            pass
+    return _value_hashes(series, _dumps_sorted)
+
+
+def _value_hashes(series, dumps):
+    cache = {}
+    out = np.zeros(len(series), dtype=np.int64)
+    for i, value in enumerate(series.tolist()):
+        if value is None:
+            continue
+        kind = type(value)
+        if kind is str:
+            out[i] = hash(value)
+        elif kind is dict or kind is list:
+            key = id(value)
+            digest = cache.get(key)
+            if digest is None:
+                digest = cache[key] = hash(dumps(value))
+            out[i] = digest
+        else:
+            out[i] = hash(dumps(value))
+    return out
+
+
+def _record_failures(column, count):
+    with _failures_lock:
+        _failures[column] += count
+
+
+def get_parse_failures():
+    """{columna: nº de valores que no se pudieron parsear} desde el arranque (o el último reset)."""
+    with _failures_lock:
+        return dict(_failures)
+
+
+def reset_parse_failures():
+    with _failures_lock:
+        _failures.clear()
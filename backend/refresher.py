@@ -0,0 +1,163 @@
+# Archivo: backend/refresher.py
+import threading
+import time
+from config.settings import Settings
+from backend.api_clients import make_client
+from backend.fleet_snapshot import SnapshotCache, build_fleet_snapshot, snapshot_cache
+from backend.snapshot_store import snapshot_store
+
+_refresher = None
+_refresher_lock = threading.Lock()
+
+
+class FleetRefresher:
+    """
+    Hilo en segundo plano que mantiene al día la foto de la flota de un tenant.
+
+    Descarga y procesa con un token de servicio (no depende de que haya nadie mirando)
+    y publica la foto nueva de golpe en la SnapshotCache compartida: las páginas solo
+    leen la última foto. Cada endpoint tiene su propio intervalo (Settings.REFRESH_INTERVALS),
+    así el consumo M2M se refresca a menudo y el catálogo de modelos muy de vez en cuando.
+    Solo refresca los endpoints que ya están en la foto: la primera carga de cada uno la hace
+    la página que lo necesita (carga por pestaña), el refresco solo los mantiene al día.
+    """
+
+    def __init__(self, cache=None, tenant_uuid=None, intervals=None, client_factory=make_client, store=None):
+        self.cache = cache if cache is not None else snapshot_cache
+        self.store = store if store is not None else snapshot_store
+        self.key = SnapshotCache.make_key(tenant_uuid)
+        self.intervals = dict(Settings.REFRESH_INTERVALS if intervals is None else intervals)
+        self.client_factory = client_factory
+        self._token = None
+        self._last_attempt = {}  # {endpoint: instante del último intento, haya ido bien o no}
+        self._force = False
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._status_lock = threading.Lock()
+        self.last_refresh = None
+        self.last_duration = None
+        self.last_endpoints = []
+        self.last_error = None
+
+    # --- CICLO DE VIDA ---
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="fleet-refresher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def refresh_now(self):
+        """Pide refrescar ya todo lo cargado en cuanto el hilo quede libre (botón 'Actualizar datos')."""
+        self._force = True
+        self._wake.set()
+
+    def status(self):
+        """Estado para mostrar en la interfaz: último refresco, duración y errores."""
+        with self._status_lock:
+            return {
+                "running": self.is_running(),
+                "last_refresh": self.last_refresh,
+                "last_duration": self.last_duration,
+                "last_endpoints": list(self.last_endpoints),
+                "last_error": self.last_error,
+            }
+
+    # --- PLANIFICACIÓN ---
+    def _loaded(self):
+        """{endpoint: instante del último intento} de los endpoints que ya están en la foto."""
+        snapshot = self.cache.latest(self.key)
+        if snapshot is None:
+            return {}
+        # Lo que ha cargado una página cuenta como refrescado en ese momento
+        return {name: self._last_attempt.get(name, snapshot.refreshed_at.get(name, 0))
+                for name in self.intervals if name in snapshot.frames}
+
+    def due_endpoints(self, now=None):
+        """Endpoints cargados cuyo intervalo ha vencido (todos los cargados si se ha forzado el refresco)."""
+        now = time.time() if now is None else now
+        loaded = self._loaded()
+        if self._force:
+            return list(loaded)
+        return [name for name, last in loaded.items() if now - last >= self.intervals[name]]
+
+    def _seconds_to_next(self, now=None):
+        now = time.time() if now is None else now
+        waits = [last + self.intervals[name] - now for name, last in self._loaded().items()]
+        return max(1.0, min(waits)) if waits else 60.0
+
+    def _run(self):
+        while not self._stop.is_set():
+            names = self.due_endpoints()
+            if names:
+                self.refresh(names)
+            else:
+                self._force = False
+            self._wake.wait(self._seconds_to_next())
+            self._wake.clear()
+
+    # --- REFRESCO ---
+    def _client(self):
+        if self._token is None:
+            self._token = self.client_factory().login(Settings.SERVICE_USER, Settings.SERVICE_PASSWORD)
+        return self.client_factory(self._token) if self._token else None
+
+    def refresh(self, names=None):
+        """Descarga y procesa `names` (o todos) y publica la foto resultante."""
+        names = list(self.intervals) if names is None else list(names)
+        self._force = False
+        start = time.perf_counter()
+        error = None
+        try:
+            client = self._client()
+            if client is None:
+                error = "No se pudo obtener el token de servicio"
+            else:
+                sync = self.cache.get_sync(self.key)
+                snapshot = self.cache.refresh(
+                    self.key,
+                    lambda previous: build_fleet_snapshot(client, sync=sync, names=names, previous=previous),
+                )
+                # Ya estamos en segundo plano: la foto se persiste aquí mismo (arranque en caliente)
+                self.store.save(self.key, snapshot)
+                failed = [name for name in names if name in snapshot.errors]
+                if failed and len(failed) == len(names):
+                    # Todo ha fallado: probablemente el token ha caducado, el próximo ciclo hace login
+                    self._token = None
+                if failed:
+                    error = "Endpoints con error: " + ", ".join(failed)
+        except Exception as e:
+            error = str(e)
+
+        finished = time.time()
+        for name in names:
+            self._last_attempt[name] = finished
+        with self._status_lock:
+            self.last_refresh = finished
+            self.last_duration = time.perf_counter() - start
+            self.last_endpoints = names
+            self.last_error = error
+        if error:
+            print(f"[refresher] {error}")
+        print(f"[refresher] {', '.join(names)} en {self.last_duration:.2f}s")
+
+
+def get_refresher():
+    """Refresher único por proceso (None si está desactivado); se arranca la primera vez."""
+    global _refresher
+    if not Settings.REFRESHER_ENABLED:
+        return None
+    with _refresher_lock:
+        if _refresher is None:
+            _refresher = FleetRefresher().start()
+        return _refresher
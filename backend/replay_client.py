@@ -0,0 +1,174 @@
+# Archivo: backend/replay_client.py
+import json
+import os
+import threading
+import time
+import pandas as pd
+from config.settings import Settings
+from backend.api_clients import CoreClient
+from backend.synthetic import SyntheticFleet
+
+# Columnas clave de cada endpoint que se hacen únicas al escalar (réplicas -r1, -r2...).
+# Se usa el mismo sufijo en todos los endpoints, así se mantienen los enlaces board <-> info/kiwi/m2m.
+SCALE_KEYS = {
+    "m2m": ["icc", "msisdn", "imei"],
+    "boards": ["uuid", "icc", "serial_number"],
+    "kiwi": ["uuid", "board_uuid", "serial_number", "mac"],
+    "info": ["uuid"],
+}
+
+_records_cache = {}
+_records_lock = threading.Lock()
+
+
+def _frame_to_records(df):
+    # Las celdas vacías del Excel llegan como NaN: la API real devuelve null
+    return df.astype(object).where(df.notna(), None).to_dict(orient="records")
+
+
+def scale_records(records, name, scale):
+    """
+    Multiplica los registros de un endpoint de la flota por `scale` (p.ej. 10 -> 10x filas).
+    Cada réplica cambia las columnas de SCALE_KEYS para que las claves sigan siendo únicas.
+    Con scale < 1 se devuelve solo una parte. Los catálogos (models/software) no se escalan.
+    """
+    if scale == 1 or name not in SCALE_KEYS or not records:
+        return records
+    target = max(1, int(round(len(records) * scale)))
+    if target <= len(records):
+        return records[:target]
+
+    base = pd.DataFrame(records)
+    keys = [col for col in SCALE_KEYS[name] if col in base.columns]
+    parts = [base]
+    replica = 1
+    while sum(len(part) for part in parts) < target:
+        part = base.copy()
+        for col in keys:
+            part[col] = part[col].map(lambda v, r=replica: None if v is None else f"{v}-r{r}")
+        parts.append(part)
+        replica += 1
+    return _frame_to_records(pd.concat(parts, ignore_index=True).head(target))
+
+
+class ReplayClient(CoreClient):
+    """
+    CoreClient que no llama a la API: sirve los ficheros del repo (boards.xlsx, m2m.xlsx...)
+    o respuestas JSON grabadas (<endpoint>.json, ver record_fixtures) con la misma interfaz
+    de getters, paginación incluida. Sirve para perfilar y hacer pruebas de carga en local.
+
+    - latency_ms: espera añadida a cada petición (y a cada página) para simular la red.
+    - scale: multiplica los endpoints de la flota (ver scale_records).
+    - synthetic: tamaño de flota sintética ("10k", "100k", "1m" o nº); si se indica, en lugar
+      de los ficheros se sirve una SyntheticFleet con semilla `seed`.
+    """
+
+    def __init__(self, token=None, session=None, source_dir=None, latency_ms=None, scale=None,
+                 synthetic=None, seed=None):
+        super().__init__(token or "replay", session=session)
+        self.source_dir = source_dir or Settings.REPLAY_DIR
+        self.latency_ms = Settings.REPLAY_LATENCY_MS if latency_ms is None else latency_ms
+        self.scale = Settings.REPLAY_SCALE if scale is None else scale
+        self.synthetic = Settings.REPLAY_SYNTHETIC if synthetic is None else synthetic
+        self.seed = Settings.REPLAY_SEED if seed is None else seed
+        self._names_by_url = {url: name for name, (url, _, _) in self.ENDPOINTS.items()}
+
+    def login(self, username=None, password=None):
+        return "replay"
+
+    def verify_token(self):
+        return bool(self.token)
+
+    def _source_path(self, name):
+        """Prioridad: respuesta JSON grabada; si no, el Excel exportado del endpoint."""
+        recorded = os.path.join(self.source_dir, f"{name}.json")
+        if os.path.isfile(recorded):
+            return recorded
+        filename = self.ENDPOINTS[name][1]
+        return os.path.join(self.source_dir, os.path.basename(filename))
+
+    def _records(self, name):
+        """Registros del endpoint (ya escalados), cacheados por proceso mientras el fichero no cambie."""
+        if self.synthetic:
+            return self._synthetic_records(name)
+        path = self._source_path(name)
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"No hay datos de replay para '{name}': {path}")
+        cache_key = (path, os.path.getmtime(path), self.scale)
+        with _records_lock:
+            if cache_key in _records_cache:
+                return _records_cache[cache_key]
+
+        if path.endswith(".json"):
+            with open(path, encoding="utf-8") as fh:
+                records = self._extract_list(json.load(fh), path)
+        else:
+            records = _frame_to_records(pd.read_excel(path))
+        records = scale_records(records, name, self.scale)
+
+        with _records_lock:
+            # Solo se guarda la versión vigente de cada fichero
+            for old in [k for k in _records_cache if k[0] == path]:
+                del _records_cache[old]
+            _records_cache[cache_key] = records
+        return records
+
+    def _synthetic_records(self, name):
+        cache_key = ("synthetic", str(self.synthetic), self.seed, name)
+        with _records_lock:
+            if cache_key in _records_cache:
+                return _records_cache[cache_key]
+        records = SyntheticFleet(self.synthetic, seed=self.seed).records(name)
+        with _records_lock:
+            _records_cache[cache_key] = records
+        return records
+
+    def _request_json(self, url, params=None):
+        name = self._names_by_url.get(url)
+        if name is None:
+            raise ValueError(f"URL sin endpoint de replay: {url}")
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        records = self._records(name)
+
+        pagination = self._pagination(name)
+        if not pagination:
+            return records
+        params = params or {}
+        size = int(params.get(pagination.get("size_param", "limit"), pagination.get("page_size", 1000)))
+        if pagination["mode"] == "page":
+            first_page = pagination.get("first_page", 1)
+            start = (int(params.get(pagination.get("page_param", "page"), first_page)) - first_page) * size
+            return records[start:start + size]
+
+        # Modo cursor: el cursor es el desplazamiento y se devuelve en cursor_field (admite 'a.b')
+        start = int(params.get(pagination.get("cursor_param", "cursor")) or 0)
+        payload = {"data": records[start:start + size]}
+        next_cursor = str(start + size) if start + size < len(records) else None
+        target = payload
+        parts = pagination.get("cursor_field", "next_cursor").split(".")
+        for part in parts[:-1]:
+            target = target.setdefault(part, {})
+        target[parts[-1]] = next_cursor
+        return payload
+
+    def _export(self, data, filename="output.xlsx"):
+        # Nunca se exporta en replay: podría sobrescribir los propios ficheros de origen
+        return
+
+
+def record_fixtures(client, names=None, out_dir=None):
+    """
+    Graba las respuestas actuales de la API como <endpoint>.json para reproducirlas
+    después con ReplayClient. Devuelve {endpoint: ruta}.
+    """
+    out_dir = out_dir or Settings.REPLAY_DIR
+    os.makedirs(out_dir, exist_ok=True)
+    paths = {}
+    for name in names or client.ENDPOINTS:
+        records = client._get_named(name, raise_errors=True)
+        path = os.path.join(out_dir, f"{name}.json")
+        with open(path, "w", encoding="utf-8") as fh:
+            json.dump(records, fh, ensure_ascii=False, default=str)
+        paths[name] = path
+    return paths
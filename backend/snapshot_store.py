@@ -0,0 +1,285 @@
+# Archivo: backend/snapshot_store.py
+import json
+import os
+import shutil
+import threading
+import time
+import weakref
+import pandas as pd
+from config.settings import Settings
+from backend.fleet_snapshot import FleetSnapshot
+from backend.json_columns import decode_json_column
+from backend.frame_utils import memory_report
+
+# pyarrow es opcional: sin él no se guardan fotos en disco (la app funciona igual, sin arranque en caliente)
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+    HAS_PYARROW = True
+except ImportError:
+    pa = None
+    pa_ipc = None
+    HAS_PYARROW = False
+
+FORMAT_VERSION = 1
+MANIFEST = "manifest.json"
+LATEST = "LATEST"
+
+
+def _json_columns(df):
+    """
+    Columnas que Arrow no puede guardar tal cual: con dicts/listas (info, alarms, *_json...)
+    o con tipos mezclados (p.ej. ratType con números y 'N/A'). Se guardan como texto JSON.
+    """
+    cols = []
+    for col in df.columns:
+        series = df[col]
+        is_category = isinstance(series.dtype, pd.CategoricalDtype)
+        if series.dtype != object and not is_category:
+            continue
+        values = series.cat.categories.to_series() if is_category else series
+        if values.map(lambda v: isinstance(v, (dict, list))).any():
+            cols.append(col)
+            continue
+        try:
+            pa.array(values, from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError):
+            cols.append(col)
+    return cols
+
+
+def _encode_json(value):
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str)
+    if value is None or (isinstance(value, float) and value != value):
+        return None
+    return json.dumps(value, default=str)
+
+
+def _to_table(df):
+    """DataFrame -> (tabla Arrow, columnas guardadas como texto JSON)."""
+    json_cols = _json_columns(df)
+    if json_cols:
+        df = df.copy()
+        for col in json_cols:
+            df[col] = df[col].astype(object).map(_encode_json).astype(object)
+    # Las columnas category se guardan como diccionario Arrow y vuelven como category
+    return pa.Table.from_pandas(df, preserve_index=False), json_cols
+
+
+def _write_arrow(table, path):
+    # IPC sin compresión: se lee con memory-map sin descomprimir ni pasar por un buffer intermedio
+    with pa.OSFile(path, "wb") as sink:
+        with pa_ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+
+def _read_arrow(path, json_cols=(), categorical=()):
+    """
+    Lee un frame de la foto. El fichero se abre con memory-map, pero to_pandas() materializa
+    todas las columnas en memoria de pandas (copia): la carga cuesta ~1x el tamaño del frame
+    en RAM, y las columnas JSON se decodifican de nuevo a dicts/listas.
+    """
+    with pa.memory_map(path, "r") as source:
+        df = pa_ipc.open_file(source).read_all().to_pandas()
+    for col in json_cols:
+        if col in df.columns:
+            df[col] = decode_json_column(df[col].astype(object), col)
+            if col in categorical:
+                df[col] = df[col].astype("category")
+    return df
+
+
+class SnapshotStore:
+    """
+    Fotos de la flota en disco, versionadas: <root>/<tenant>/<versión>/<frame>.arrow + manifest.json.
+
+    Tras reiniciar el servidor se carga la última foto buena (sin esperar a la API) mientras
+    se descarga una nueva; y si core.kiconex.com no responde sirve de modo sin conexión.
+    Cada versión se escribe en un directorio temporal y se publica con un rename atómico,
+    así un corte a mitad de escritura nunca deja una foto a medias como la última.
+    Los frames que no han cambiado desde la versión anterior (el mismo objeto DataFrame, p.ej.
+    boards en un refresco solo de m2m) no se reescriben: se enlaza (hardlink) o copia su .arrow.
+    """
+
+    def __init__(self, root=None, keep=None):
+        self.root = root or Settings.SNAPSHOT_STORE_DIR
+        self.keep = Settings.SNAPSHOT_STORE_KEEP if keep is None else keep
+        self._write_lock = threading.Lock()
+        # {tenant: {frame: (weakref al DataFrame, ruta del .arrow, metadatos del manifest)}}
+        self._written = {}
+
+    @property
+    def enabled(self):
+        return Settings.SNAPSHOT_STORE_ENABLED and HAS_PYARROW
+
+    def _tenant_dir(self, key):
+        return os.path.join(self.root, str(key))
+
+    # --- ESCRITURA ---
+    def save(self, key, snapshot):
+        """Guarda la foto como nueva versión. Devuelve la versión o None si no se ha guardado."""
+        if not self.enabled or snapshot.all_failed():
+            return None
+        with self._write_lock:
+            tenant_dir = self._tenant_dir(key)
+            os.makedirs(tenant_dir, exist_ok=True)
+            # La versión es el instante de guardado: una foto ampliada por pestaña conserva el
+            # created_at de la original y no debe pisar su directorio
+            saved_at = time.time()
+            version = time.strftime("%Y%m%dT%H%M%S", time.gmtime(saved_at)) + f"-{int(saved_at * 1e6) % 1_000_000:06d}"
+            suffix = 1
+            base_version = version
+            while os.path.exists(os.path.join(tenant_dir, version)):
+                version = f"{base_version}-{suffix}"
+                suffix += 1
+            tmp_dir = os.path.join(tenant_dir, f".tmp-{version}")
+            final_dir = os.path.join(tenant_dir, version)
+            try:
+                os.makedirs(tmp_dir, exist_ok=True)
+                frames = {}
+                written = {}
+                for name, df in snapshot.frames.items():
+                    path = os.path.join(tmp_dir, f"{name}.arrow")
+                    meta = self._reuse(key, name, df, path)
+                    if meta is None:
+                        table, json_cols = _to_table(df)
+                        _write_arrow(table, path)
+                        meta = {
+                            "file": f"{name}.arrow",
+                            "rows": len(df),
+                            "json_columns": json_cols,
+                            "categorical_columns": [c for c in json_cols if isinstance(df[c].dtype, pd.CategoricalDtype)],
+                        }
+                    frames[name] = meta
+                    written[name] = (weakref.ref(df), os.path.join(final_dir, meta["file"]), meta)
+                manifest = {
+                    "format_version": FORMAT_VERSION,
+                    "version": version,
+                    "tenant": str(key),
+                    "created_at": snapshot.created_at,
+                    "frames": frames,
+                    "timings": snapshot.timings,
+                    "errors": snapshot.errors,
+                    "refreshed_at": snapshot.refreshed_at,
+                }
+                with open(os.path.join(tmp_dir, MANIFEST), "w", encoding="utf-8") as fh:
+                    json.dump(manifest, fh, ensure_ascii=False, indent=2)
+                os.replace(tmp_dir, final_dir)
+                self._write_latest(tenant_dir, version)
+                self._written[str(key)] = written
+            except Exception as e:
+                print(f"Error guardando la foto en disco: {e}")
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+                return None
+            self._prune(tenant_dir)
+        return version
+
+    def _reuse(self, key, name, df, path):
+        """
+        Si `df` es el mismo objeto que se guardó (o cargó) en la versión anterior, enlaza su
+        fichero en `path` y devuelve sus metadatos; None si hay que escribirlo.
+        """
+        previous = self._written.get(str(key), {}).get(name)
+        if previous is None or previous[0]() is not df or not os.path.isfile(previous[1]):
+            return None
+        try:
+            os.link(previous[1], path)
+        except OSError:
+            # Sistemas de ficheros sin hardlinks: copia, sigue siendo más barata que convertir
+            try:
+                shutil.copyfile(previous[1], path)
+            except OSError:
+                return None
+        return previous[2]
+
+    def save_async(self, key, snapshot):
+        """Igual que save() pero en un hilo daemon: quien descarga no espera a la escritura."""
+        if not self.enabled:
+            return
+        threading.Thread(target=self.save, args=(key, snapshot), name="snapshot-store", daemon=True).start()
+
+    def _write_latest(self, tenant_dir, version):
+        tmp = os.path.join(tenant_dir, LATEST + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as fh:
+            fh.write(version)
+        os.replace(tmp, os.path.join(tenant_dir, LATEST))
+
+    def _prune(self, tenant_dir):
+        if self.keep <= 0:
+            return
+        for version in self.versions_in(tenant_dir)[:-self.keep]:
+            shutil.rmtree(os.path.join(tenant_dir, version), ignore_errors=True)
+
+    # --- LECTURA ---
+    @staticmethod
+    def versions_in(tenant_dir):
+        """Versiones completas (con manifest) ordenadas de la más antigua a la más reciente."""
+        if not os.path.isdir(tenant_dir):
+            return []
+        return sorted(
+            entry for entry in os.listdir(tenant_dir)
+            if not entry.startswith(".") and os.path.isfile(os.path.join(tenant_dir, entry, MANIFEST))
+        )
+
+    def versions(self, key):
+        return self.versions_in(self._tenant_dir(key))
+
+    def load_latest(self, key):
+        """Última foto buena del tenant o None. Si la última está dañada se prueba con la anterior."""
+        if not self.enabled:
+            return None
+        tenant_dir = self._tenant_dir(key)
+        candidates = self.versions_in(tenant_dir)
+        latest_path = os.path.join(tenant_dir, LATEST)
+        if os.path.isfile(latest_path):
+            with open(latest_path, encoding="utf-8") as fh:
+                latest = fh.read().strip()
+            if latest in candidates:
+                candidates.remove(latest)
+                candidates.append(latest)
+        for version in reversed(candidates):
+            try:
+                return self.load(key, version)
+            except Exception as e:
+                print(f"Foto en disco {version} no válida: {e}")
+        return None
+
+    def load(self, key, version):
+        version_dir = os.path.join(self._tenant_dir(key), version)
+        with open(os.path.join(version_dir, MANIFEST), encoding="utf-8") as fh:
+            manifest = json.load(fh)
+        if manifest.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"formato {manifest.get('format_version')} no soportado")
+        frames = {
+            name: _read_arrow(os.path.join(version_dir, meta["file"]), meta.get("json_columns", ()),
+                               meta.get("categorical_columns", ()))
+            for name, meta in manifest["frames"].items()
+        }
+        snapshot = FleetSnapshot(frames, timings=manifest.get("timings"), errors=manifest.get("errors"),
+                                 created_at=manifest["created_at"])
+        snapshot.refreshed_at = manifest.get("refreshed_at", {})
+        snapshot.origin = "disco"
+        snapshot.version = manifest["version"]
+        snapshot.memory = {name: memory_report(df) for name, df in frames.items()}
+        with self._write_lock:
+            # Tras un arranque en caliente, la siguiente versión puede enlazar estos ficheros
+            self._written[str(key)] = {
+                name: (weakref.ref(frames[name]), os.path.join(version_dir, meta["file"]), meta)
+                for name, meta in manifest["frames"].items()
+            }
+        return snapshot
+
+    def warm_start(self, cache, key):
+        """Si la caché está vacía (servidor recién arrancado) publica en ella la última foto de disco."""
+        if cache.latest(key) is not None:
+            return None
+        snapshot = self.load_latest(key)
+        if snapshot is not None:
+            cache.put(key, snapshot)
+            print(f"[store] arranque en caliente con la foto {snapshot.version}")
+        return snapshot
+
+
+# Instancia compartida por el proceso
+snapshot_store = SnapshotStore()
@@ -0,0 +1,278 @@
+# Archivo: backend/synthetic.py
+import json
+import numpy as np
+import pandas as pd
+
+# Tamaños de referencia para pruebas de escala (nº de boards y de SIMs)
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+# Distribuciones observadas en los exports reales (boards.xlsx, m2m.xlsx...)
+BOARD_STATES = {"Terminado": 0.917, "Fabricado": 0.044, "Eliminado": 0.037, "Asignado": 0.002}
+KIWI_STATES = {"Terminado": 0.89, "Fabricado": 0.08, "Asignado": 0.03}
+LIFECYCLE_STATUS = {"ACTIVE": 0.65, "ACTIVATION_READY": 0.18, "DEACTIVATED": 0.11, "INACTIVE_NEW": 0.058, "TEST": 0.002}
+RAT_TYPES = {6: 0.57, None: 0.25, 1: 0.155, 2: 0.023, 255: 0.002}
+SERVICE_PACKS = {
+    "m2m Nacional + EU 1GB": 0.60, "m2m Nacional + EU 500": 0.26, "m2m Nacional + EU 5GB": 0.03,
+    "m2m Zona1 500": 0.02, "m2m Nacional + EU 250": 0.01, "m2m LATAM 500": 0.01, None: 0.06,
+}
+COUNTRIES = {"ES": 0.86, "FR": 0.04, "PT": 0.03, "IT": 0.02, "DE": 0.02, "MX": 0.01, None: 0.02}
+DEVICE_TYPES = {"kibox": 6, "kiwi": 3, "router": 4}  # nº de modelos por tipo
+VERSIONS_PER_MODEL = 4
+
+# Orden de los endpoints: cada uno usa su propia semilla derivada (se pueden generar por separado)
+ENDPOINTS = ["m2m", "boards", "kiwi", "info", "models", "software"]
+
+
+def _uuid(prefix, index):
+    """UUID determinista a partir de un prefijo (tipo de entidad) y un índice."""
+    index = np.asarray(index, dtype=np.uint64)
+    mixed = (index * np.uint64(2654435761)) % np.uint64(2 ** 48)
+    return [f"{prefix:08x}-{(i >> 32) & 0xffff:04x}-4{(i >> 16) & 0xfff:03x}-8{i & 0xfff:03x}-{m:012x}"
+            for i, m in zip(index.tolist(), mixed.tolist())]
+
+
+def _choice(rng, distribution, size):
+    """Muestra `size` valores de {valor: peso} (los pesos se normalizan)."""
+    values = list(distribution)
+    weights = np.array(list(distribution.values()), dtype=float)
+    picks = rng.choice(len(values), size=size, p=weights / weights.sum())
+    return [values[i] for i in picks]
+
+
+def _iso(rng, start, end, size):
+    """Fechas ISO 8601 (UTC, con milisegundos como la API) uniformes entre start y end."""
+    lo, hi = pd.Timestamp(start).value // 10 ** 9, pd.Timestamp(end).value // 10 ** 9
+    seconds = rng.integers(lo, hi, size=size)
+    return pd.to_datetime(seconds, unit="s").strftime("%Y-%m-%dT%H:%M:%S.000Z").tolist()
+
+
+class SyntheticFleet:
+    """
+    Flota sintética con los mismos esquemas que la API, para pruebas de escala y benchmarks.
+
+    - Determinista: misma semilla + mismos tamaños -> mismos registros (cada endpoint por separado).
+    - Enlazada: boards.version_uuid / kiwi.version_uuid apuntan al software, el software a los modelos,
+      info.uuid y kiwi.board_uuid a boards, y boards.icc a las SIMs de m2m.
+    - Organizaciones con distribución sesgada (Zipf): pocas organizaciones concentran la flota.
+    - json_style="dict" devuelve los campos anidados como dicts/listas (API); "json" como texto JSON;
+      "text" como el texto con comillas simples de los Excel exportados.
+    - malformed_ratio: fracción de consumptionDaily / info con JSON inválido (prueba los contadores de fallos).
+    """
+
+    def __init__(self, size=10_000, seed=42, sims=None, kiwi=None, info_ratio=0.8, organizations=None,
+                 json_style="dict", malformed_ratio=0.0):
+        if isinstance(size, str):
+            # "10k" / "100k" / "1m" o un número como texto (CORE_REPLAY_SYNTHETIC=3000)
+            size = size.strip().lower()
+            self.size = int(size) if size.isdigit() else SIZES[size]
+        else:
+            self.size = int(size)
+        self.seed = seed
+        self.counts = {
+            "boards": self.size,
+            "m2m": self.size if sims is None else int(sims),
+            "kiwi": max(1, self.size // 25) if kiwi is None else int(kiwi),
+            "info": int(self.size * info_ratio),
+        }
+        self.n_organizations = organizations or max(20, int(self.size ** 0.5))
+        self.json_style = json_style
+        self.malformed_ratio = malformed_ratio
+        self.organizations = [f"ORG-{i:05d}" for i in range(self.n_organizations)]
+        # Pesos Zipf (s=1.1): la primera organización tiene ~10x más equipos que la décima
+        weights = 1.0 / np.arange(1, self.n_organizations + 1) ** 1.1
+        self.org_weights = weights / weights.sum()
+
+    def _rng(self, name):
+        return np.random.default_rng([self.seed, ENDPOINTS.index(name)])
+
+    # --- CATÁLOGO ---
+    def models(self):
+        records = []
+        for device_type, count in DEVICE_TYPES.items():
+            for i in range(count):
+                records.append({"device_type": device_type, "name": f"{device_type.capitalize()}{i}"})
+        uuids = _uuid(0x0d0de1, range(len(records)))
+        for record, uuid in zip(records, uuids):
+            record.update({"uuid": uuid, "description": None,
+                           "create_ts": "2025-12-10T15:11:29.000Z", "update_ts": "2025-12-10T15:11:32.000Z"})
+        return records
+
+    def software(self):
+        records = []
+        for model in self.models():
+            for v in range(VERSIONS_PER_MODEL):
+                records.append({"model_uuid": model["uuid"], "name": f"v{v + 1}.{v * 2}.0",
+                                "device_type": model["device_type"],
+                                "create_ts": "2025-12-10T15:11:29.000Z", "update_ts": "2025-12-10T15:11:32.000Z"})
+        uuids = _uuid(0x50f7, range(len(records)))
+        for record, uuid in zip(records, uuids):
+            record["uuid"] = uuid
+        return records
+
+    def _versions(self, device_type):
+        return [s["uuid"] for s in self.software() if s["device_type"] == device_type]
+
+    # --- FLOTA ---
+    def board_uuids(self, index=None):
+        index = np.arange(self.counts["boards"]) if index is None else index
+        return _uuid(0xb0a2d, index)
+
+    def iccs(self, index=None):
+        index = np.arange(self.counts["m2m"]) if index is None else np.asarray(index)
+        return [f"8934{i:015d}" for i in index.tolist()]
+
+    def boards(self):
+        n = self.counts["boards"]
+        rng = self._rng("boards")
+        versions = self._versions("kibox") + self._versions("router")
+        # Las versiones más nuevas están menos extendidas
+        version_weights = np.linspace(1.0, 0.2, len(versions))
+        version_idx = rng.choice(len(versions), size=n, p=version_weights / version_weights.sum())
+        org_idx = rng.choice(self.n_organizations, size=n, p=self.org_weights)
+        no_org = rng.random(n) < 0.29
+        has_sim = rng.random(n) < 0.48
+        sim_idx = rng.integers(0, max(1, self.counts["m2m"]), size=n)
+        states = _choice(rng, BOARD_STATES, n)
+        dates = _iso(rng, "2019-01-01", "2025-10-01", n)
+        uuids = self.board_uuids()
+        iccs = self.iccs(sim_idx)
+        return [
+            {
+                "ki_id": 200_000_000 + i,
+                "name": f"{self.organizations[org_idx[i]]} - Equipo {i}",
+                "final_client": None if no_org[i] else self.organizations[org_idx[i]],
+                "uuid": uuids[i],
+                "serial_number": f"SN{i:09d}",
+                "hardware_version": "A20-OLinuXino-LIME2-e16Gs16M",
+                "date": dates[i],
+                "icc": iccs[i] if has_sim[i] else None,
+                "state": states[i],
+                "vpn": 0,
+                "version_uuid": versions[version_idx[i]],
+                "comercial_info": self._nested({"name": f"Equipo {i}", "state": states[i]}),
+            }
+            for i in range(n)
+        ]
+
+    def kiwi(self):
+        n = self.counts["kiwi"]
+        rng = self._rng("kiwi")
+        versions = self._versions("kiwi")
+        version_idx = rng.integers(0, len(versions), size=n)
+        board_idx = rng.integers(0, max(1, self.counts["boards"]), size=n)
+        linked = rng.random(n) < 0.87
+        states = _choice(rng, KIWI_STATES, n)
+        dates = _iso(rng, "2021-01-01", "2025-10-01", n)
+        uuids = _uuid(0x1c1, np.arange(n))
+        board_uuids = self.board_uuids(board_idx)
+        return [
+            {
+                "uuid": uuids[i],
+                "date": dates[i],
+                "state": states[i],
+                "mac": ":".join(f"{(i >> s) & 0xff:02X}" for s in (40, 32, 24, 16, 8, 0)),
+                "serial_number": f"2021{i:08d}",
+                "version_uuid": versions[version_idx[i]],
+                "ssid": f"KIWI_{i & 0xffffff:06X}",
+                "board_uuid": board_uuids[i] if linked[i] else None,
+            }
+            for i in range(n)
+        ]
+
+    def m2m(self):
+        n = self.counts["m2m"]
+        rng = self._rng("m2m")
+        org_idx = rng.choice(self.n_organizations, size=n, p=self.org_weights)
+        no_org = rng.random(n) < 0.065
+        statuses = _choice(rng, LIFECYCLE_STATUS, n)
+        rat_types = _choice(rng, RAT_TYPES, n)
+        packs = _choice(rng, SERVICE_PACKS, n)
+        countries = _choice(rng, COUNTRIES, n)
+        # Consumo muy sesgado (lognormal): la mayoría gasta poco y unas pocas SIMs mucho
+        daily = np.where(rng.random(n) < 0.35, 0, rng.lognormal(13, 2.0, n)).astype(np.int64)
+        monthly = (daily * rng.uniform(5, 30, n)).astype(np.int64)
+        sms = rng.poisson(0.3, n)
+        alarms = np.where(rng.random(n) < 0.002, 2, 0)
+        broken = rng.random(n) < self.malformed_ratio
+        iccs = self.iccs()
+        return [
+            {
+                "alias": f"SIM {i}",
+                "customField1": None if no_org[i] else self.organizations[org_idx[i]],
+                "icc": iccs[i],
+                "msisdn": 345_900_000_000_000 + i,
+                "lifeCycleStatus": statuses[i],
+                "consumptionDaily": self._nested(self._consumption(int(daily[i]), int(sms[i])), broken[i]),
+                "consumptionMonthly": self._nested(self._consumption(int(monthly[i]), int(sms[i]) * 20)),
+                "presence": self._nested(self._presence(countries[i], rat_types[i])),
+                "ratType": rat_types[i],
+                "servicePack": packs[i],
+                "alarms": self._nested([int(alarms[i])]),
+            }
+            for i in range(n)
+        ]
+
+    def info(self):
+        n = self.counts["info"]
+        rng = self._rng("info")
+        board_idx = rng.choice(self.counts["boards"], size=n, replace=False) if n <= self.counts["boards"] \
+            else rng.integers(0, self.counts["boards"], size=n)
+        has_info = rng.random(n) < 0.4  # en el export real ~60% de info viene vacío
+        compiled = _iso(rng, "2022-01-01", "2025-10-01", n)
+        updated = _iso(rng, "2025-01-01", "2025-10-01", n)
+        versions = [f"v0.{minor}-{patch}-{rng_hex}" for minor, patch, rng_hex in
+                    zip(rng.integers(1, 5, n).tolist(), rng.integers(0, 9, n).tolist(),
+                        [f"{x:07x}" for x in rng.integers(0, 0xfffffff, n).tolist()])]
+        broken = rng.random(n) < self.malformed_ratio
+        uuids = self.board_uuids(board_idx)
+        records = []
+        for i in range(n):
+            if not has_info[i]:
+                records.append({"uuid": uuids[i], "info": None, "update_ts": None})
+                continue
+            info = {
+                "_type": "device-info",
+                "osname": "debian-10-buster",
+                "board_model": "A20",
+                "comercial_model": "Kibox 2",
+                "quiiotd_version": versions[i],
+                "compilation_date": compiled[i].replace("T", " ").replace(".000Z", "+00:00"),
+            }
+            records.append({"uuid": uuids[i], "info": self._nested(info, broken[i]), "update_ts": updated[i]})
+        return records
+
+    # --- CAMPOS ANIDADOS ---
+    @staticmethod
+    def _consumption(data_bytes, sms):
+        def counter(value, limit=0):
+            return {"limit": limit, "value": value, "thrReached": 0, "enabled": False, "trafficCut": False}
+        return {"voice": counter(0), "sms": counter(sms), "data": counter(data_bytes, 419430400)}
+
+    @staticmethod
+    def _presence(country, rat_type):
+        if country is None:
+            return {"additionalIp": "", "lastUsedIp": ""}
+        return {"sgsn": {"operator": {"countryCode": country}}, "ratType": rat_type,
+                "additionalIp": "", "lastUsedIp": ""}
+
+    def _nested(self, value, broken=False):
+        if broken:
+            return "{'roto': "
+        if self.json_style == "dict":
+            return value
+        # Mismo formato que los Excel exportados: repr de Python (comillas simples)
+        return str(value) if self.json_style == "text" else json.dumps(value)
+
+    # --- API COMÚN ---
+    def records(self, name):
+        """Registros de un endpoint ('m2m', 'boards', 'kiwi', 'info', 'models', 'software')."""
+        if name not in ENDPOINTS:
+            raise ValueError(f"Endpoint sintético desconocido: {name}. Opciones: {ENDPOINTS}")
+        return getattr(self, name)()
+
+    def frame(self, name):
+        return pd.DataFrame(self.records(name))
+
+    def payloads(self, names=None):
+        """{endpoint: registros} para todos los endpoints (o los indicados)."""
+        return {name: self.records(name) for name in names or ENDPOINTS}
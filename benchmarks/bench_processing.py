@@ -0,0 +1,246 @@
+# Archivo: benchmarks/bench_processing.py
+"""
+Benchmarks de las funciones calientes del backend sobre flotas sintéticas (backend/synthetic.py).
+
+Mide tiempo (mínimo y mediana de N repeticiones) y pico de memoria (tracemalloc, en una
+pasada aparte para no falsear los tiempos) de:
+process_m2m, process_devicesInfo, prepare_boards, prepare_kiwi, _merge_model_info,
+el parseo de CoreClient._get_data (respuesta JSON -> registros / DataFrame) y el refresco
+sin cambios de DeltaSync con diff por hash (delta_sync_*, comparar con process_m2m/prepare_boards).
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_processing                       # 10k, compara con la baseline si existe
+    python -m benchmarks.bench_processing --sizes 10k,100k --repeat 5
+    python -m benchmarks.bench_processing --save-baseline       # guarda los resultados como baseline
+    python -m benchmarks.bench_processing --only process_m2m,prepare_boards
+
+Los resultados se escriben en JSON (--output). Con baseline, el proceso termina con código 1
+si algún caso es más lento que la baseline por encima de --tolerance (p.ej. 0.25 = +25%).
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+import requests
+from backend.synthetic import SyntheticFleet
+from backend.api_clients import CoreClient
+from backend.delta_sync import DeltaSync
+from backend.M2M.data_m2m import process_m2m
+from backend.Info.data_info import process_devicesInfo
+from backend.Device.data_device import prepare_boards, prepare_kiwi, _merge_model_info
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+DEFAULT_OUTPUT = os.path.join(BENCH_DIR, "results", "latest.json")
+
+
+class _StaticSession:
+    """Sesión HTTP falsa: devuelve siempre el mismo cuerpo JSON ya serializado (sin red)."""
+
+    def __init__(self, body):
+        self.body = body
+
+    def get(self, url, headers=None, params=None, timeout=None, **kwargs):
+        response = requests.Response()
+        response.status_code = 200
+        response._content = self.body
+        response.headers["Content-Type"] = "application/json"
+        response.url = url
+        return response
+
+
+def _catalog(fleet):
+    return pd.DataFrame(fleet.records("models")), pd.DataFrame(fleet.records("software"))
+
+
+# Cada caso: setup(fleet) -> función sin argumentos a cronometrar (las entradas se preparan fuera)
+def _case_process_m2m(fleet):
+    records = fleet.records("m2m")
+    return lambda: process_m2m(records), len(records)
+
+
+def _case_process_devices_info(fleet):
+    records = fleet.records("info")
+    return lambda: process_devicesInfo(records), len(records)
+
+
+def _case_prepare_boards(fleet):
+    records = fleet.records("boards")
+    df_models, df_soft = _catalog(fleet)
+    return lambda: prepare_boards(records, df_models=df_models, df_soft=df_soft), len(records)
+
+
+def _case_prepare_kiwi(fleet):
+    records = fleet.records("kiwi")
+    df_models, df_soft = _catalog(fleet)
+    return lambda: prepare_kiwi(records, df_models=df_models, df_soft=df_soft), len(records)
+
+
+def _case_merge_model_info(fleet):
+    df = pd.DataFrame(fleet.records("boards"))
+    df_models, df_soft = _catalog(fleet)
+    # _merge_model_info añade columnas in situ: se trabaja sobre una copia superficial
+    return lambda: _merge_model_info(df.copy(deep=False), df_soft, df_models), len(df)
+
+
+def _case_get_data(fleet, as_frame):
+    records = fleet.records("m2m")
+    body = json.dumps({"data": records}).encode("utf-8")
+    client = CoreClient(token="bench", session=_StaticSession(body))
+    url, filename, params = client.ENDPOINTS["m2m"]
+    return lambda: client._get_data(url, filename, params, as_frame=as_frame), len(records)
+
+
+def _case_delta_sync(fleet, name, key, processor):
+    # Refresco con la misma descarga: hash de todos los registros, ninguno cambiado
+    records = fleet.records(name)
+    sync = DeltaSync(name, key, diff_full=True)
+    sync.apply(records, processor)
+    return lambda: sync.apply(records, processor), len(records)
+
+
+def _case_delta_sync_boards(fleet):
+    df_models, df_soft = _catalog(fleet)
+
+    def processor(raw):
+        return prepare_boards(raw, df_models=df_models, df_soft=df_soft)
+    return _case_delta_sync(fleet, "boards", "uuid", processor)
+
+
+CASES = {
+    "process_m2m": _case_process_m2m,
+    "process_devicesInfo": _case_process_devices_info,
+    "prepare_boards": _case_prepare_boards,
+    "prepare_kiwi": _case_prepare_kiwi,
+    "_merge_model_info": _case_merge_model_info,
+    "get_data_records": lambda fleet: _case_get_data(fleet, as_frame=False),
+    "get_data_frame": lambda fleet: _case_get_data(fleet, as_frame=True),
+    "delta_sync_m2m": lambda fleet: _case_delta_sync(fleet, "m2m", "icc", process_m2m),
+    "delta_sync_boards": _case_delta_sync_boards,
+}
+
+
+def run_case(name, fleet, repeat):
+    func, rows = CASES[name](fleet)
+    func()  # calentamiento (índices cacheados, imports perezosos...)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "rows": rows,
+        "repeat": repeat,
+        "min_s": round(min(timings), 6),
+        "median_s": round(statistics.median(timings), 6),
+        "rows_per_s": round(rows / statistics.median(timings)) if rows else None,
+        "peak_mb": round(peak / 1_048_576, 2),
+    }
+
+
+def run(sizes, repeat, only=None, seed=42):
+    names = only or list(CASES)
+    results = {}
+    for size in sizes:
+        fleet = SyntheticFleet(size, seed=seed)
+        for name in names:
+            key = f"{name}[{size}]"
+            results[key] = run_case(name, fleet, repeat)
+            r = results[key]
+            print(f"{key:32s} mediana {r['median_s']:.4f}s  mín {r['min_s']:.4f}s  "
+                  f"pico {r['peak_mb']:.1f} MB  ({r['rows']} filas)")
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "platform": platform.platform(),
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def compare(current, baseline, tolerance):
+    """Devuelve la lista de regresiones (casos más lentos que la baseline + tolerancia)."""
+    regressions = []
+    for key, result in current["results"].items():
+        base = baseline.get("results", {}).get(key)
+        if not base or not base.get("median_s"):
+            continue
+        ratio = result["median_s"] / base["median_s"]
+        mem_ratio = result["peak_mb"] / base["peak_mb"] if base.get("peak_mb") else 1.0
+        flag = ""
+        if ratio > 1 + tolerance:
+            flag = "  <-- REGRESIÓN (tiempo)"
+            regressions.append(key)
+        elif mem_ratio > 1 + tolerance:
+            flag = "  <-- REGRESIÓN (memoria)"
+            regressions.append(key)
+        print(f"{key:32s} x{ratio:.2f} tiempo  x{mem_ratio:.2f} memoria{flag}")
+    return regressions
+
+
+def _write_json(data, path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(data, fh, indent=2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks del procesado de la flota")
+    parser.add_argument("--sizes", default="10k", help="Tamaños separados por comas: 10k,100k,1m o números")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", default="", help=f"Casos separados por comas. Opciones: {','.join(CASES)}")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Guarda los resultados como nueva baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Margen antes de marcar regresión (0.25 = +25%%)")
+    args = parser.parse_args(argv)
+
+    only = [name.strip() for name in args.only.split(",") if name.strip()]
+    unknown = [name for name in only if name not in CASES]
+    if unknown:
+        parser.error(f"Casos desconocidos: {unknown}")
+    sizes = [size.strip() for size in args.sizes.split(",") if size.strip()]
+    sizes = [int(size) if size.isdigit() else size for size in sizes]
+
+    current = run(sizes, args.repeat, only=only, seed=args.seed)
+    _write_json(current, args.output)
+    print(f"Resultados en {args.output}")
+
+    if args.save_baseline:
+        _write_json(current, args.baseline)
+        print(f"Baseline guardada en {args.baseline}")
+        return 0
+
+    if not os.path.isfile(args.baseline):
+        print("Sin baseline: ejecuta con --save-baseline para crearla.")
+        return 0
+    with open(args.baseline, encoding="utf-8") as fh:
+        baseline = json.load(fh)
+    regressions = compare(current, baseline, args.tolerance)
+    if regressions:
+        print(f"{len(regressions)} regresiones respecto a la baseline: {', '.join(regressions)}")
+        return 1
+    print("Sin regresiones respecto a la baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
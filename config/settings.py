@@ -22,4 +22,111 @@ class Settings:
     URL_MODEL_B = f"{BASE_URL}/models"
     URL_MODEL_K = f"{BASE_URL}/versions"
     URL_INFO = f"{BASE_URL}/boards/info"
-    URL_M2M = f"{BASE_URL}/m2m"
\ No newline at end of file
+    URL_M2M = f"{BASE_URL}/m2m"
+
+    # --- ORIGEN DE DATOS ---
+    # "api" (core.kiconex.com) o "replay" (ficheros locales, ver backend/replay_client.py)
+    CLIENT_BACKEND = os.getenv("CORE_CLIENT_BACKEND", "api")
+    REPLAY_DIR = os.getenv("CORE_REPLAY_DIR", ".")  # <endpoint>.json grabados o los .xlsx del repo
+    REPLAY_LATENCY_MS = float(os.getenv("CORE_REPLAY_LATENCY_MS", "0"))  # latencia simulada por petición
+    REPLAY_SCALE = float(os.getenv("CORE_REPLAY_SCALE", "1"))  # multiplicador de filas de la flota
+    REPLAY_SYNTHETIC = os.getenv("CORE_REPLAY_SYNTHETIC", "")  # "10k" | "100k" | "1m": flota sintética
+    REPLAY_SEED = int(os.getenv("CORE_REPLAY_SEED", "42"))
+
+    # --- DESCARGA CONCURRENTE ---
+    # Número máximo de endpoints que se descargan en paralelo en CoreClient.fetch_all()
+    FETCH_MAX_WORKERS = int(os.getenv("CORE_FETCH_MAX_WORKERS", "6"))
+
+    # --- CACHÉ DE DATOS ---
+    # Segundos que una foto de la flota se reutiliza entre reruns antes de volver a descargar
+    SNAPSHOT_TTL_SECONDS = int(os.getenv("CORE_SNAPSHOT_TTL", "300"))
+    # Segundos que se da por buena la validación de un token antes de volver a comprobarlo en la API
+    TOKEN_CHECK_TTL_SECONDS = int(os.getenv("CORE_TOKEN_CHECK_TTL", "60"))
+
+    # --- REFRESCO EN SEGUNDO PLANO (backend/refresher.py) ---
+    # Un hilo mantiene al día, con un token de servicio, los endpoints que ya ha cargado alguna página
+    REFRESHER_ENABLED = os.getenv("CORE_REFRESHER", "true").lower() in ("1", "true", "yes")
+    SERVICE_USER = os.getenv("CORE_SERVICE_USERNAME") or USER
+    SERVICE_PASSWORD = os.getenv("CORE_SERVICE_PASSWORD") or PASSWORD
+    # Segundos entre refrescos de cada endpoint: el consumo M2M cambia mucho más que el catálogo
+    REFRESH_INTERVALS = {
+        "m2m": int(os.getenv("CORE_REFRESH_M2M", "120")),
+        "boards": int(os.getenv("CORE_REFRESH_BOARDS", "300")),
+        "kiwi": int(os.getenv("CORE_REFRESH_KIWI", "300")),
+        "info": int(os.getenv("CORE_REFRESH_INFO", "600")),
+        "models": int(os.getenv("CORE_REFRESH_MODELS", "3600")),
+        "software": int(os.getenv("CORE_REFRESH_SOFTWARE", "3600")),
+    }
+
+    # --- DIAGNÓSTICO (backend/instrumentation.py) ---
+    # Tiempos, filas y bytes por etapa (HTTP, JSON, procesado, exportación, vistas)
+    INSTRUMENTATION_ENABLED = os.getenv("CORE_INSTRUMENTATION", "true").lower() in ("1", "true", "yes")
+    INSTRUMENTATION_LOG = os.getenv("CORE_INSTRUMENTATION_LOG", "false").lower() in ("1", "true", "yes")  # JSON por línea
+    METRICS_FILE = os.getenv("CORE_METRICS_FILE")  # p.ej. /var/lib/node_exporter/dashboard.prom
+    DIAGNOSTICS_PANEL = os.getenv("CORE_DIAGNOSTICS_PANEL", "true").lower() in ("1", "true", "yes")
+
+    # --- FOTOS EN DISCO (backend/snapshot_store.py, requiere pyarrow) ---
+    # Arranque en caliente tras reiniciar el servidor y modo sin conexión si la API no responde
+    SNAPSHOT_STORE_ENABLED = os.getenv("CORE_SNAPSHOT_STORE", "true").lower() in ("1", "true", "yes")
+    SNAPSHOT_STORE_DIR = os.getenv("CORE_SNAPSHOT_STORE_DIR", ".snapshots")
+    SNAPSHOT_STORE_KEEP = int(os.getenv("CORE_SNAPSHOT_STORE_KEEP", "3"))  # versiones que se conservan
+
+    # --- CONEXIÓN HTTP (sesión compartida de CoreClient) ---
+    HTTP_POOL_CONNECTIONS = int(os.getenv("CORE_HTTP_POOL_CONNECTIONS", "4"))  # hosts distintos en el pool
+    HTTP_POOL_MAXSIZE = int(os.getenv("CORE_HTTP_POOL_MAXSIZE", "12"))  # conexiones keep-alive por host
+    HTTP_CONNECT_TIMEOUT = float(os.getenv("CORE_HTTP_CONNECT_TIMEOUT", "5"))
+    HTTP_READ_TIMEOUT = float(os.getenv("CORE_HTTP_READ_TIMEOUT", "60"))
+    HTTP_MAX_RETRIES = int(os.getenv("CORE_HTTP_MAX_RETRIES", "3"))
+    HTTP_BACKOFF_FACTOR = float(os.getenv("CORE_HTTP_BACKOFF_FACTOR", "0.5"))  # 0.5s, 1s, 2s...
+    HTTP_RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    # --- EXPORTACIÓN A DISCO (opcional, en segundo plano) ---
+    EXPORT_ENABLED = os.getenv("CORE_EXPORT_ENABLED", "false").lower() in ("1", "true", "yes")
+    EXPORT_FORMAT = os.getenv("CORE_EXPORT_FORMAT", "jsonl.gz")  # xlsx | parquet | feather | jsonl.gz
+    EXPORT_DIR = os.getenv("CORE_EXPORT_DIR", ".")
+
+    # --- PAGINACIÓN / INGESTA POR BLOQUES ---
+    # mode: None (una sola petición), "page" (page/limit) o "cursor" (token de la respuesta en cursor_field)
+    # En modo "page" se para con una página vacía o al alcanzar el total de la respuesta (total_field)
+    PAGINATION = {
+        "boards": {"mode": os.getenv("CORE_BOARDS_PAGINATION"), "page_param": "page", "size_param": "limit",
+                   "page_size": 1000, "first_page": 1, "cursor_param": "cursor", "cursor_field": "next_cursor",
+                   "total_field": "total"},
+        "kiwi": {"mode": os.getenv("CORE_KIWI_PAGINATION"), "page_param": "page", "size_param": "limit",
+                 "page_size": 1000, "first_page": 1, "cursor_param": "cursor", "cursor_field": "next_cursor",
+                 "total_field": "total"},
+        "m2m": {"mode": os.getenv("CORE_M2M_PAGINATION"), "page_param": "page", "size_param": "limit",
+                "page_size": 1000, "first_page": 1, "cursor_param": "cursor", "cursor_field": "next_cursor",
+                "total_field": "total"},
+    }
+    PAGINATION_MAX_PAGES = 10000  # salvaguarda contra bucles infinitos
+    INGEST_CHUNK_ROWS = int(os.getenv("CORE_INGEST_CHUNK_ROWS", "5000"))  # filas por DataFrame parcial
+
+    # --- SINCRONIZACIÓN INCREMENTAL (boards / kiwi / m2m) ---
+    # key: identificador estable del registro. since_param: parámetro de la API para pedir solo
+    # cambios desde la marca de agua (watermark_field); si es None cada descarga se procesa entera
+    # (diff_full=True fuerza comparar la descarga completa contra la anterior por hash).
+    DELTA_SYNC_ENABLED = os.getenv("CORE_DELTA_SYNC", "true").lower() in ("1", "true", "yes")
+    DELTA_SYNC = {
+        "boards": {"key": "uuid", "since_param": os.getenv("CORE_BOARDS_SINCE_PARAM"), "watermark_field": "updated_at"},
+        "kiwi": {"key": "uuid", "since_param": os.getenv("CORE_KIWI_SINCE_PARAM"), "watermark_field": "updated_at"},
+        "m2m": {"key": "icc", "since_param": os.getenv("CORE_M2M_SINCE_PARAM"), "watermark_field": "lastUpdate"},
+    }
+
+    # --- DATAFRAMES COMPACTOS ---
+    COMPACT_FRAMES = os.getenv("CORE_COMPACT_FRAMES", "true").lower() in ("1", "true", "yes")
+    CATEGORY_MAX_RATIO = 0.5  # solo se usa category si valores distintos <= 50% de las filas
+    USE_PYARROW_STRINGS = os.getenv("CORE_PYARROW_STRINGS", "false").lower() in ("1", "true", "yes")
+
+    # --- ETIQUETAS DE ESTADO DE DISPOSITIVOS (Boards y Kiwi) ---
+    # Valores de 'state'/'status' (en minúsculas) que producen la etiqueta "match"; el resto -> "default"
+    DEVICE_STATE_LABELS = {
+        "status_clean": {"values": ["terminado", "online", "connected", "true"],
+                         "match": "Conectado", "default": "Desconectado"},
+        "enabled_clean": {"values": ["terminado", "asignado", "fabricado", "true", "enabled"],
+                          "match": "Habilitado", "default": "Deshabilitado"},
+    }
+
+    # --- SOFTWARE / FIRMWARE ---
+    # Firmware compilado a partir de esta fecha (YYYY-MM-DD) se considera "Actualizado"
+    SOFTWARE_UPDATE_CUTOFF = os.getenv("CORE_SOFTWARE_UPDATE_CUTOFF", "2025-06-01")
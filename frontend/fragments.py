@@ -0,0 +1,17 @@
+# Archivo: frontend/fragments.py
+import streamlit as st
+
+# st.fragment (Streamlit >= 1.37); antes existía como st.experimental_fragment
+_fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+
+
+def fragment(func):
+    """
+    Decorador: la función se ejecuta como fragmento de Streamlit. Un widget de dentro
+    (filtro, clic en un gráfico con on_select="rerun") solo vuelve a ejecutar esa función,
+    no el script completo (login, carga de datos, resto de vistas).
+    En versiones sin fragmentos se llama a la función sin más.
+    """
+    if _fragment is None:
+        return func
+    return _fragment(func)
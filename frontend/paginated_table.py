@@ -0,0 +1,113 @@
+# Archivo: frontend/paginated_table.py
+import math
+import numpy as np
+import pandas as pd
+import streamlit as st
+from backend.aggregations import aggregation_memo
+
+PAGE_SIZES = [25, 50, 100, 250]
+NO_SORT = "(sin orden)"
+
+# st.toggle llegó en Streamlit 1.26; antes, casilla normal
+_toggle = getattr(st, "toggle", st.checkbox)
+
+
+def default_columns(df):
+    """Columnas visibles por defecto: todo menos las intermedias *_json (dicts parseados)."""
+    return [col for col in df.columns if not str(col).endswith("_json")]
+
+
+def _search_mask(series, text):
+    """Filas cuyo valor contiene `text` (sin distinguir mayúsculas)."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Se busca en las categorías (pocas) y se compara por código
+        categories = pd.Series(series.cat.categories.astype(str))
+        hits = np.flatnonzero(categories.str.contains(text, case=False, regex=False).to_numpy())
+        return np.isin(series.cat.codes.to_numpy(), hits)
+    return series.astype(str).str.contains(text, case=False, regex=False, na=False).to_numpy()
+
+
+def _sort_order(series, ascending):
+    """Orden estable de las filas de `series` (posiciones relativas), nulos al final."""
+    values = series.reset_index(drop=True)
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.astype(str)
+    try:
+        ordered = values.sort_values(ascending=ascending, kind="stable", na_position="last")
+    except TypeError:
+        # Columnas object con tipos mezclados: se ordena como texto
+        ordered = values.astype(str).sort_values(ascending=ascending, kind="stable")
+    return ordered.index.to_numpy()
+
+
+def table_rows(df, positions, columns, search, sort_col, ascending):
+    """Posiciones (iloc) de las filas a mostrar: filtro de búsqueda + orden, sin copiar el DataFrame."""
+    rows = np.arange(len(df)) if positions is None else np.asarray(positions)
+    if search:
+        mask = np.zeros(len(rows), dtype=bool)
+        for col in columns:
+            mask |= _search_mask(df[col].iloc[rows], search)
+        rows = rows[mask]
+    if sort_col and sort_col in df.columns and len(rows):
+        rows = rows[_sort_order(df[sort_col].iloc[rows], ascending)]
+    return rows
+
+
+def paginated_table(label, df, key, positions=None, state=(), columns=None):
+    """
+    Tabla de detalle paginada en el servidor: al navegador solo llega la página visible
+    con las columnas elegidas. Búsqueda y orden se resuelven aquí (memoizados por estado).
+
+    - label: texto del interruptor que muestra la tabla; apagado no se calcula ni envía nada.
+    - df: DataFrame base (compartido, no se modifica).
+    - positions: filas (iloc) del filtro actual, None = todas, o una función que las
+      devuelve (solo se evalúa con la tabla visible).
+    - state: clave hashable del filtro actual (para memoizar búsqueda/orden).
+    - columns: columnas visibles por defecto (por defecto, todas menos *_json).
+    """
+    if not _toggle(label, key=f"{key}_show"):
+        return
+    if df is None or df.empty:
+        st.info("Sin datos.")
+        return
+
+    all_columns = list(df.columns)
+    defaults = [col for col in (columns or default_columns(df)) if col in all_columns]
+
+    c_cols, c_search = st.columns([2, 1])
+    with c_cols:
+        visible = st.multiselect("Columnas", all_columns, default=defaults, key=f"{key}_cols")
+    with c_search:
+        search = st.text_input("🔍 Buscar", key=f"{key}_search").strip()
+    c_sort, c_dir, c_size = st.columns([2, 1, 1])
+    with c_sort:
+        sort_col = st.selectbox("Ordenar por", [NO_SORT] + visible, key=f"{key}_sort")
+    with c_dir:
+        ascending = st.radio("Sentido", ["Asc", "Desc"], horizontal=True, key=f"{key}_dir") == "Asc"
+    with c_size:
+        page_size = st.selectbox("Filas por página", PAGE_SIZES, index=1, key=f"{key}_size")
+
+    if not visible:
+        st.caption("Selecciona al menos una columna.")
+        return
+
+    sort_col = None if sort_col == NO_SORT else sort_col
+    memo_key = ("paginated_table", key, state, tuple(visible) if search else (), search, sort_col, ascending)
+    rows = aggregation_memo.get(
+        df, memo_key,
+        lambda: table_rows(df, positions() if callable(positions) else positions, visible, search, sort_col, ascending),
+    )
+
+    total = len(rows)
+    pages = max(1, math.ceil(total / page_size))
+    page_key = f"{key}_page"
+    if st.session_state.get(page_key, 1) > pages:
+        # El filtro ha reducido las filas: se vuelve a la primera página
+        st.session_state[page_key] = 1
+    page = st.number_input(f"Página (de {pages})", min_value=1, max_value=pages, step=1, key=page_key)
+
+    start = (int(page) - 1) * page_size
+    page_rows = rows[start:start + page_size]
+    # Solo se materializan las filas de la página
+    st.dataframe(df.iloc[page_rows][visible], use_container_width=True, hide_index=True)
+    st.caption(f"Filas {start + 1 if total else 0}–{start + len(page_rows)} de {total}")
@@ -2,6 +2,13 @@
 import streamlit as st
 import plotly.express as px
 import pandas as pd
+from backend.Device.device_filters import get_filter_engine
+from backend.instrumentation import instrumented
+from frontend.fragments import fragment
+from frontend.paginated_table import paginated_table
+
+# Serialización y envío de cada figura al navegador (etapa "plotly" dentro de la vista)
+plotly_chart = instrumented("plotly")(st.plotly_chart)
 
 # =====================================================
 #  1. ESTILOS CSS
@@ -54,12 +61,12 @@ def get_consistent_colors(items):
         color_map[item] = full_palette[i % len(full_palette)]
     return color_map
 
-def create_html_legend(df, col_name, color_map, title=None):
-    """Genera HTML limpio para la leyenda."""
-    if df.empty or col_name not in df.columns:
+def create_html_legend(df_counts, col_name, color_map, title=None):
+    """Genera HTML limpio para la leyenda a partir de una tabla de conteos [col_name, count]."""
+    if df_counts.empty or col_name not in df_counts.columns:
         return f'<div class="custom-legend-box">Sin datos</div>'
 
-    counts = df[col_name].value_counts()
+    counts = df_counts.set_index(col_name)["count"]
     total = counts.sum()
     
     html = '<div class="custom-legend-box">'
@@ -82,6 +89,7 @@ def create_html_legend(df, col_name, color_map, title=None):
 # =====================================================
 #  3. RENDER PRINCIPAL
 # =====================================================
+@instrumented("view.devices")
 def render(df_devices, key_prefix=None):
     load_custom_css()
 
@@ -96,16 +104,24 @@ def render(df_devices, key_prefix=None):
     if key_prefix is None:
         key_prefix = "kiwi" if is_kiwi else "std"
     
-    # Rellenar nulos
-    for col in ['organization', 'model', 'status_clean', 'enabled_clean']:
-        if col not in df_devices.columns: df_devices[col] = "Desconocido"
-
     st.markdown("## 🏭 Inventario de Dispositivos")
 
+    # Filtros, drill-down, tartas y tabla: en un fragmento, un clic solo repinta este panel
+    render_inventory(df_devices, key_prefix, is_kiwi)
+
+
+@fragment
+@instrumented("fragment.devices")
+def render_inventory(df_devices, key_prefix, is_kiwi):
+    # Índices por organización/modelo/estado (una vez por foto de datos). Las columnas que
+    # falten cuentan como "Desconocido" sin tocar el DataFrame, que es compartido entre sesiones
+    engine = get_filter_engine(df_devices)
+
     # =====================================================
     #  A. LÓGICA DE FILTRADO (ESTABLE)
     # =====================================================
-    df_active = df_devices.copy()
+    # Estado de filtros {columna: valor}: se resuelve por intersección de índices, sin copiar filas
+    filtros = {}
     
     # Variables de estado para saber si estamos filtrando por modelo específico
     is_model_filtered = False
@@ -117,34 +133,34 @@ def render(df_devices, key_prefix=None):
         # --- MODO KIWI ---
         if is_kiwi:
             with col_f1:
-                modelos = ["Todos"] + sorted(df_active["model"].astype(str).unique().tolist())
+                modelos = ["Todos"] + engine.options("model")
                 sel_model = st.selectbox("📦 Modelo (Kiwi)", modelos, key=f"{key_prefix}_filter_model")
             
             if sel_model != "Todos":
-                df_active = df_active[df_active["model"] == sel_model]
+                filtros["model"] = sel_model
                 is_model_filtered = True
                 current_model_name = sel_model
 
         # --- MODO ESTÁNDAR ---
         else:
             with col_f1:
-                orgs = ["Todas"] + sorted(df_active["organization"].astype(str).unique().tolist())
+                orgs = ["Todas"] + engine.options("organization")
                 sel_org = st.selectbox("🏢 Organización", orgs, key=f"{key_prefix}_filter_org")
             
             if sel_org != "Todas":
-                df_active = df_active[df_active["organization"] == sel_org]
+                filtros["organization"] = sel_org
 
             with col_f2:
-                modelos_disp = ["Todos"] + sorted(df_active["model"].astype(str).unique().tolist())
+                modelos_disp = ["Todos"] + engine.options("model", filtros)
                 sel_model_sub = st.selectbox("📦 Modelo", modelos_disp, key=f"{key_prefix}_filter_model_sub")
             
             if sel_model_sub != "Todos":
-                df_active = df_active[df_active["model"] == sel_model_sub]
+                filtros["model"] = sel_model_sub
                 is_model_filtered = True
                 current_model_name = sel_model_sub
 
     # --- VALIDACIÓN FINAL ---
-    if df_active.empty:
+    if engine.count(filtros) == 0:
         st.info("No hay registros que coincidan con los filtros seleccionados.")
         return
 
@@ -156,9 +172,8 @@ def render(df_devices, key_prefix=None):
     col_left, col_right = st.columns([2, 1])
     selected_drilldown = None
     
-    # Colores consistentes para MODELOS
-    df_counts = df_active.groupby("model").size().reset_index(name="count")
-    df_counts = df_counts.sort_values(by="count", ascending=False)
+    # Colores consistentes para MODELOS (tabla de conteos: alimenta barras y leyenda)
+    df_counts = engine.counts("model", filtros)
     color_map_models = get_consistent_colors(df_counts['model'].unique())
 
     # --- IZQUIERDA: GRÁFICO DE BARRAS (MODELOS) ---
@@ -174,7 +189,7 @@ def render(df_devices, key_prefix=None):
         fig_hist.update_layout(showlegend=False, margin=dict(t=10, b=10), height=400)
         fig_hist.update_traces(textposition='outside')
         
-        event = st.plotly_chart(
+        event = plotly_chart(
             fig_hist, 
             use_container_width=True, 
             on_select="rerun", 
@@ -187,21 +202,21 @@ def render(df_devices, key_prefix=None):
     # --- DEFINIR CONTEXTO (¿QUÉ DATOS VEMOS ABAJO?) ---
     # Si clicamos barra -> Filtramos por esa barra
     if selected_drilldown:
-        df_context = df_active[df_active["model"] == selected_drilldown]
+        filtros_context = {**filtros, "model": selected_drilldown}
         context_title = f"🔎 {selected_drilldown}"
         is_viewing_specific_model = True
         model_name_display = selected_drilldown
     
     # Si no clicamos barra, pero el dropdown ya filtró un modelo específico
     elif is_model_filtered:
-        df_context = df_active
+        filtros_context = filtros
         context_title = f"📦 {current_model_name}"
         is_viewing_specific_model = True
         model_name_display = current_model_name
     
     # Vista general
     else:
-        df_context = df_active
+        filtros_context = filtros
         context_title = "🩺 Estado General"
         is_viewing_specific_model = False
         model_name_display = ""
@@ -214,11 +229,11 @@ def render(df_devices, key_prefix=None):
             st.markdown(f"### 🏢 En Organizaciones")
             
             # Generamos colores para las organizaciones
-            unique_orgs = df_context['organization'].unique()
-            color_map_orgs = get_consistent_colors(unique_orgs)
+            df_orgs = engine.counts("organization", filtros_context)
+            color_map_orgs = get_consistent_colors(df_orgs['organization'])
             
             html_orgs = create_html_legend(
-                df_context, 
+                df_orgs, 
                 'organization', 
                 color_map_orgs, 
                 f"Usuarios de {model_name_display}"
@@ -233,7 +248,7 @@ def render(df_devices, key_prefix=None):
         else:
             st.markdown("### Lista de Modelos")
             html_m = create_html_legend(
-                df_active, 
+                df_counts, 
                 'model', 
                 color_map_models, 
                 "Modelos Visibles"
@@ -254,39 +269,38 @@ def render(df_devices, key_prefix=None):
 
     with col_pie1:
         st.markdown("#### Conectividad")
-        df_c = df_context['status_clean'].value_counts().reset_index(name='count')
-        df_c.columns = ['status', 'count']
+        df_c = engine.counts("status_clean", filtros_context).rename(columns={"status_clean": "status"})
         
         fig1 = px.pie(df_c, values='count', names='status', color='status', 
                       color_discrete_map=colors_status, hole=0.5)
         fig1.update_layout(height=250, margin=dict(t=20,b=20,l=20,r=20))
-        st.plotly_chart(fig1, use_container_width=True, key=f"{key_prefix}_pie_conn")
+        plotly_chart(fig1, use_container_width=True, key=f"{key_prefix}_pie_conn")
 
     with col_pie2:
         st.markdown("#### Operatividad")
-        df_e = df_context['enabled_clean'].value_counts().reset_index(name='count')
-        df_e.columns = ['status', 'count']
+        df_e = engine.counts("enabled_clean", filtros_context).rename(columns={"enabled_clean": "status"})
         
         fig2 = px.pie(df_e, values='count', names='status', color='status',
                       color_discrete_map=colors_enabled, hole=0.5)
         fig2.update_layout(height=250, margin=dict(t=20,b=20,l=20,r=20))
-        st.plotly_chart(fig2, use_container_width=True, key=f"{key_prefix}_pie_oper")
+        plotly_chart(fig2, use_container_width=True, key=f"{key_prefix}_pie_oper")
 
     st.markdown("---")
 
     # =====================================================
     #  D. TABLA FINAL
     # =====================================================
-    label_tabla = f"📂 Ver Listado Detallado ({len(df_context)} registros)"
+    # Etiqueta fija (si cambia, Streamlit trata el interruptor como otro widget); el detalle va aparte
+    label_tabla = f"{engine.count(filtros_context)} registros"
     if is_viewing_specific_model:
         label_tabla += f" (Filtrado por: {model_name_display})"
+    st.caption(label_tabla)
 
-    with st.expander(label_tabla, expanded=False):
-        cols_base = ['uuid', 'name', 'model', 'organization', 'status_clean', 'enabled_clean', 'ssid', 'version_uuid']
-        cols_show = [c for c in cols_base if c in df_context.columns]
-        
-        st.dataframe(
-            df_context[cols_show],
-            use_container_width=True,
-            hide_index=True
-        )
\ No newline at end of file
+    # Paginada en el servidor y solo bajo demanda: al navegador llega únicamente la página visible
+    cols_base = ['uuid', 'name', 'model', 'organization', 'status_clean', 'enabled_clean', 'ssid', 'version_uuid']
+    paginated_table(
+        "📂 Ver Listado Detallado", df_devices, key=f"{key_prefix}_tabla",
+        positions=lambda: engine.positions(filtros_context),
+        state=tuple(sorted(filtros_context.items())),
+        columns=[c for c in cols_base if c in df_devices.columns],
+    )
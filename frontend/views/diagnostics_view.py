@@ -0,0 +1,33 @@
+# Archivo: frontend/views/diagnostics_view.py
+import streamlit as st
+from backend.instrumentation import recorder
+from backend.json_columns import get_parse_failures
+
+
+def render():
+    """Panel de diagnóstico (sidebar): tiempo, filas y bytes por etapa + fallos de parseo JSON."""
+    with st.expander("🩺 Diagnóstico"):
+        summary = recorder.summary()
+        if summary.empty:
+            st.caption("Aún no hay etapas medidas.")
+        else:
+            table = summary[["stage", "calls", "last_s", "mean_s", "max_s", "last_rows", "last_bytes"]].copy()
+            table["last_bytes"] = (table["last_bytes"].astype(float) / 1_048_576).round(2)
+            table = table.rename(columns={
+                "stage": "Etapa", "calls": "Llamadas", "last_s": "Última (s)", "mean_s": "Media (s)",
+                "max_s": "Máx (s)", "last_rows": "Filas", "last_bytes": "MB",
+            })
+            st.dataframe(table.round(3), hide_index=True, use_container_width=True)
+
+        failures = get_parse_failures()
+        if failures:
+            st.caption("JSON no válido por columna: " + ", ".join(f"{col}: {n}" for col, n in failures.items()))
+
+        st.download_button(
+            "Métricas (Prometheus)",
+            data=recorder.prometheus_text(),
+            file_name="dashboard_metrics.prom",
+            mime="text/plain",
+        )
+        if st.button("Reiniciar mediciones"):
+            recorder.reset()
@@ -1,7 +1,10 @@
 import streamlit as st
 import plotly.express as px
-import pandas as pd
-from datetime import datetime
+from backend.aggregations import count_table
+from backend.instrumentation import instrumented
+
+# Serialización y envío de cada figura al navegador (etapa "plotly" dentro de la vista)
+plotly_chart = instrumented("plotly")(st.plotly_chart)
 
 def load_custom_css():
     st.markdown("""
@@ -28,6 +31,7 @@ def load_custom_css():
 
 
 
+@instrumented("view.info")
 def render(df):
 
     load_custom_css()
@@ -38,28 +42,11 @@ def render(df):
 
     st.markdown("### ⚙️ Software & Versiones (Quiiotd)")
 
-    # ============================================================
-    # PREPARACIÓN DE DATOS
-    # ============================================================
-
-    # Convertir fechas → datetime naive (sin timezone)
-    if "compilation_date" in df.columns:
-        df["compilation_date_dt"] = (
-            pd.to_datetime(df["compilation_date"], errors="coerce")
-            .dt.tz_localize(None)
-        )
-    else:
-        df["compilation_date_dt"] = None
-
-    # Clasificación de actualización
-    cutoff = datetime(2025, 6, 1)
-
-    def classify(d):
-        if pd.isna(d):
-            return "Sin Datos"
-        return "Actualizado" if d >= cutoff else "Desactualizado"
-
-    df["update_status"] = df["compilation_date_dt"].apply(classify)
+    # compilation_date_dt y update_status ya vienen calculados desde
+    # backend/Info/data_info.process_devicesInfo: aquí solo se leen.
+    if "update_status" not in df.columns:
+        st.warning("⚠️ Los datos de software no incluyen el estado de actualización.")
+        return
 
 
     # ============================================================
@@ -107,7 +94,7 @@ def render(df):
     with col1:
         st.subheader("📦 Histograma de versiones Quiiotd")
 
-        df_hist = df["quiiotd_version"].fillna("Desconocido").value_counts().reset_index()
+        df_hist = count_table(df.assign(quiiotd_version=df["quiiotd_version"].fillna("Desconocido")), "quiiotd_version")
         df_hist.columns = ["Versión", "Cantidad"]
         df_hist = df_hist.sort_values(by="Versión")
 
@@ -120,7 +107,7 @@ def render(df):
             color_continuous_scale="Blues"
         )
         fig.update_layout(height=350, xaxis=dict(type="category"))
-        st.plotly_chart(fig, use_container_width=True)
+        plotly_chart(fig, use_container_width=True)
 
 
 
@@ -131,7 +118,7 @@ def render(df):
     with col2:
         st.subheader("🔄 Estado de actualización")
 
-        df_pie = df["update_status"].value_counts().reset_index()
+        df_pie = count_table(df, "update_status")
         df_pie.columns = ["Estado", "Cantidad"]
 
         fig2 = px.pie(
@@ -143,10 +130,11 @@ def render(df):
             color_discrete_map={
                 "Actualizado": "#28a745",
                 "Desactualizado": "#dc3545",
-                "Sin Datos": "#adb5bd"
+                "Sin Datos": "#adb5bd",
+                "Desconocido": "#6c757d"
             }
         )
 
         fig2.update_traces(textinfo="percent+label")
         fig2.update_layout(height=330)
-        st.plotly_chart(fig2, use_container_width=True)
+        plotly_chart(fig2, use_container_width=True)
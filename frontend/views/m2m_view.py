@@ -1,6 +1,15 @@
 import streamlit as st
 import plotly.express as px
+import numpy as np
 import pandas as pd
+from backend.aggregations import aggregation_memo
+from backend.M2M.m2m_cube import build_m2m_cube, cube_counts, cube_slice, cube_totals
+from backend.instrumentation import instrumented
+from frontend.fragments import fragment
+from frontend.paginated_table import paginated_table
+
+# Serialización y envío de cada figura al navegador (etapa "plotly" dentro de la vista)
+plotly_chart = instrumented("plotly")(st.plotly_chart)
 
 # =====================================================
 #  1. ESTILOS CSS (MODERNO Y LIMPIO)
@@ -101,9 +110,9 @@ def get_consistent_colors(items):
         color_map[item] = full_palette[i % len(full_palette)]
     return color_map
 
-def create_html_legend(df, col_name, color_map):
-    """Genera el HTML limpio para la leyenda."""
-    counts = df[col_name].value_counts()
+def create_html_legend(df_counts, col_name, color_map):
+    """Genera el HTML limpio para la leyenda a partir de una tabla de conteos [col_name, count]."""
+    counts = df_counts.set_index(col_name)["count"]
     total = counts.sum()
     
     html = '<div class="custom-legend-box">'
@@ -148,11 +157,11 @@ def preparar_datos_con_hover(df, col_categoria, col_id='icc'):
     # Agrupación
     try:
         # Agrupamos los IDs
-        df_grouped = df.groupby(col_categoria)[col_id].apply(listar_sims).reset_index()
+        df_grouped = df.groupby(col_categoria, observed=True)[col_id].apply(listar_sims).reset_index()
         df_grouped.columns = ['Categoría', 'sims_list']
         
         # Contamos cantidades
-        df_counts = df[col_categoria].value_counts().reset_index()
+        df_counts = df[col_categoria].value_counts().loc[lambda c: c > 0].reset_index()
         df_counts.columns = ['Categoría', 'Cantidad SIMs']
         
         # Unimos
@@ -170,7 +179,8 @@ def preparar_datos_con_hover(df, col_categoria, col_id='icc'):
 # =====================================================
 #  3. RENDERIZADO PRINCIPAL
 # =====================================================
-def render(df_m2m):
+@instrumented("view.m2m")
+def render(df_m2m, cube=None):
     load_custom_css()
     
     st.markdown("## 📡 Gestión de Comunicaciones (M2M)")
@@ -179,17 +189,37 @@ def render(df_m2m):
         st.info("No hay datos disponibles.")
         return
 
+    # Cubo precalculado con la foto (fleet_snapshot); fotos antiguas sin cubo: se calcula una vez
+    if cube is None or cube.empty:
+        cube = aggregation_memo.get(df_m2m, ("m2m_cube",), lambda: build_m2m_cube(df_m2m))
+
+    # Todo depende del filtro de organización: en un fragmento, cambiarlo solo repinta esta vista
+    render_panel(df_m2m, cube)
+
+
+@fragment
+@instrumented("fragment.m2m")
+def render_panel(df_m2m, cube):
     # --- FILTROS ---
     with st.container():
         orgs = ["Todas"]
-        if "organization" in df_m2m.columns:
-            orgs += sorted(df_m2m["organization"].unique())
+        if "organization" in cube.columns:
+            orgs += sorted(cube["organization"].astype(str).unique())
         sel_org = st.selectbox("🏢 Organización", orgs)
 
-    df_filt = df_m2m.copy()
+    # KPIs y tartas salen del corte del cubo; las filas solo hacen falta para histogramas y tabla
+    cube_org = cube_slice(cube, organization=None if sel_org == "Todas" else sel_org)
+    df_filt = df_m2m
     if sel_org != "Todas":
         df_filt = df_filt[df_filt["organization"] == sel_org]
 
+    # Conteos por categoría: se calculan una vez por organización y los reutilizan tartas y leyendas
+    tablas = aggregation_memo.get(
+        cube, ("m2m_counts", sel_org),
+        lambda: {col: cube_counts(cube_org, col) for col in ["status_clean", "network_type", "country_code", "rate_plan"]},
+    )
+    totales = aggregation_memo.get(cube, ("m2m_totals", sel_org), lambda: cube_totals(cube_org))
+
     st.markdown("---")
 
     # =====================================================
@@ -206,14 +236,14 @@ def render(df_m2m):
     
     # Si no encontramos ninguna, creamos una temporal con el índice
     if col_id_sim == 'index_id':
-        df_filt['index_id'] = df_filt.index.astype(str)
+        df_filt = df_filt.assign(index_id=df_filt.index.astype(str))
 
     # --- KPIs ---
     k1, k2, k3 = st.columns(3)
-    k1.metric("Total SIMs", len(df_filt))
+    k1.metric("Total SIMs", totales["sims"])
     
-    alarms = df_filt["alarm_count"].sum() if "alarm_count" in df_filt.columns else 0
-    sims_alert = (df_filt["alarm_count"] > 0).sum() if "alarm_count" in df_filt.columns else 0
+    alarms = totales["alarms"] or 0
+    sims_alert = totales["sims_alarm"] or 0
     
     k2.metric("Alarmas Totales", int(alarms))
     k3.metric("SIMs con Alertas", int(sims_alert))
@@ -227,16 +257,16 @@ def render(df_m2m):
     with c1:
         st.markdown("### 🟢 Estado")
         if "status_clean" in df_filt.columns:
-            fig = px.pie(df_filt, names="status_clean", hole=0.6, color_discrete_sequence=px.colors.qualitative.Bold)
+            fig = px.pie(tablas["status_clean"], names="status_clean", values="count", hole=0.6, color_discrete_sequence=px.colors.qualitative.Bold)
             fig.update_layout(margin=dict(t=20, b=20, l=20, r=20), height=300)
-            st.plotly_chart(fig, use_container_width=True)
+            plotly_chart(fig, use_container_width=True)
 
     with c2:
         st.markdown("### 📡 Red")
         if "network_type" in df_filt.columns:
-            fig = px.pie(df_filt, names="network_type", hole=0.6, color_discrete_sequence=px.colors.qualitative.Safe)
+            fig = px.pie(tablas["network_type"], names="network_type", values="count", hole=0.6, color_discrete_sequence=px.colors.qualitative.Safe)
             fig.update_layout(margin=dict(t=20, b=20, l=20, r=20), height=300)
-            st.plotly_chart(fig, use_container_width=True)
+            plotly_chart(fig, use_container_width=True)
 
     st.markdown("---")
 
@@ -245,44 +275,44 @@ def render(df_m2m):
     # =====================================================
     st.markdown("### 🌍 Distribución Geográfica")
     if "country_code" in df_filt.columns:
-        paises_unicos = df_filt["country_code"].unique()
-        mapa_colores_pais = get_consistent_colors(paises_unicos)
+        df_paises = tablas["country_code"]
+        mapa_colores_pais = get_consistent_colors(df_paises["country_code"])
         
         col_graf, col_ley = st.columns([2, 1])
         with col_graf:
             fig = px.pie(
-                df_filt, names="country_code", hole=0.5,
+                df_paises, names="country_code", values="count", hole=0.5,
                 color="country_code", color_discrete_map=mapa_colores_pais
             )
             fig.update_traces(textinfo='percent') 
             fig.update_layout(showlegend=False, margin=dict(t=0, b=0, l=0, r=0), height=350)
-            st.plotly_chart(fig, use_container_width=True)
+            plotly_chart(fig, use_container_width=True)
             
         with col_ley:
             st.caption("Detalle por País")
-            html_pais = create_html_legend(df_filt, "country_code", mapa_colores_pais)
+            html_pais = create_html_legend(df_paises, "country_code", mapa_colores_pais)
             st.markdown(html_pais, unsafe_allow_html=True)
 
     st.markdown("---")
 
     st.markdown("### 💳 Planes de Servicio")
     if "rate_plan" in df_filt.columns:
-        planes_unicos = df_filt["rate_plan"].unique()
-        mapa_colores_plan = get_consistent_colors(planes_unicos)
+        df_planes = tablas["rate_plan"]
+        mapa_colores_plan = get_consistent_colors(df_planes["rate_plan"])
         
         col_graf_p, col_ley_p = st.columns([2, 1])
         with col_graf_p:
             fig = px.pie(
-                df_filt, names="rate_plan", hole=0.5,
+                df_planes, names="rate_plan", values="count", hole=0.5,
                 color="rate_plan", color_discrete_map=mapa_colores_plan
             )
             fig.update_traces(textposition='inside', textinfo='percent')
             fig.update_layout(showlegend=False, margin=dict(t=0, b=0, l=0, r=0), height=400)
-            st.plotly_chart(fig, use_container_width=True)
+            plotly_chart(fig, use_container_width=True)
             
         with col_ley_p:
             st.caption("Lista Completa de Planes (Scroll) 👇")
-            html_planes = create_html_legend(df_filt, "rate_plan", mapa_colores_plan)
+            html_planes = create_html_legend(df_planes, "rate_plan", mapa_colores_plan)
             st.markdown(html_planes, unsafe_allow_html=True)
     
     # =====================================================
@@ -297,9 +327,9 @@ def render(df_m2m):
     with tab_diario:
         if "cons_daily_mb" in df_filt.columns and "usage_tier_daily" in df_filt.columns:
             # KPIs
-            c_total = df_filt["cons_daily_mb"].sum()
-            c_avg = df_filt["cons_daily_mb"].mean()
-            c_max = df_filt["cons_daily_mb"].max()
+            c_total = totales["cons_daily"] / 1048576.0
+            c_avg = totales["cons_daily_mb_mean"]
+            c_max = totales["cons_daily_mb_max"]
             
             kd1, kd2, kd3 = st.columns(3)
             kd1.metric("Promedio Diario", f"{c_avg:.2f} MB")
@@ -311,7 +341,10 @@ def render(df_m2m):
             
             with subtab_bar:
                 # Usamos la columna ID detectada dinámicamente
-                df_viz = preparar_datos_con_hover(df_filt, "usage_tier_daily", col_id_sim)
+                df_viz = aggregation_memo.get(
+                    df_m2m, ("m2m_tier_daily", sel_org, col_id_sim),
+                    lambda: preparar_datos_con_hover(df_filt, "usage_tier_daily", col_id_sim),
+                )
                 
                 fig_bar = px.bar(
                     df_viz, x='Categoría', y='Cantidad SIMs', text_auto=True,
@@ -320,7 +353,7 @@ def render(df_m2m):
                 )
                 fig_bar.update_traces(hovertemplate="<b>%{x}</b><br>SIMs: %{y}<br><br>%{customdata[0]}<extra></extra>")
                 fig_bar.update_layout(plot_bgcolor='rgba(0,0,0,0)', height=350, showlegend=False)
-                st.plotly_chart(fig_bar, use_container_width=True)
+                plotly_chart(fig_bar, use_container_width=True)
 
             with subtab_box:
                 st.info("ℹ️ **¿Qué muestra esto?** Los puntos aislados a la derecha son las SIMs 'Outliers' (Anómalas) que consumen mucho más que el rango normal.")
@@ -334,7 +367,7 @@ def render(df_m2m):
                     )
                     fig_hist.update_traces(marker_color='#002b5c')
                     fig_hist.update_layout(plot_bgcolor='rgba(0,0,0,0)', height=400, xaxis_title="Consumo (MB)")
-                    st.plotly_chart(fig_hist, use_container_width=True)
+                    plotly_chart(fig_hist, use_container_width=True)
                 else:
                     st.warning("No hay consumo diario activo.")
         else:
@@ -343,9 +376,9 @@ def render(df_m2m):
     # --- TAB 2: MENSUAL ---
     with tab_mensual:
         if "cons_month_mb" in df_filt.columns and "usage_tier_month" in df_filt.columns:
-            cm_total = df_filt["cons_month_mb"].sum()
-            cm_avg = df_filt["cons_month_mb"].mean()
-            cm_max = df_filt["cons_month_mb"].max()
+            cm_total = totales["cons_month"] / 1048576.0
+            cm_avg = totales["cons_month_mb_mean"]
+            cm_max = totales["cons_month_mb_max"]
             
             km1, km2, km3 = st.columns(3)
             km1.metric("Promedio Mes", f"{cm_avg:.2f} MB")
@@ -356,7 +389,10 @@ def render(df_m2m):
             subtab_bar_m, subtab_box_m = st.tabs(["📊 Distribución", "📦 Anomalías"])
             
             with subtab_bar_m:
-                df_viz_m = preparar_datos_con_hover(df_filt, "usage_tier_month", col_id_sim)
+                df_viz_m = aggregation_memo.get(
+                    df_m2m, ("m2m_tier_month", sel_org, col_id_sim),
+                    lambda: preparar_datos_con_hover(df_filt, "usage_tier_month", col_id_sim),
+                )
                 fig_bar_m = px.bar(
                     df_viz_m, x='Categoría', y='Cantidad SIMs', text_auto=True,
                     color='Cantidad SIMs', color_continuous_scale=px.colors.sequential.Blues,
@@ -364,7 +400,7 @@ def render(df_m2m):
                 )
                 fig_bar_m.update_traces(hovertemplate="<b>%{x}</b><br>SIMs: %{y}<br><br>%{customdata[0]}<extra></extra>")
                 fig_bar_m.update_layout(plot_bgcolor='rgba(0,0,0,0)', height=350, showlegend=False)
-                st.plotly_chart(fig_bar_m, use_container_width=True)
+                plotly_chart(fig_bar_m, use_container_width=True)
 
             with subtab_box_m:
                 st.info("ℹ️ **Análisis de Anomalías:** Identifica SIMs con comportamiento inusual en el acumulado mensual.")
@@ -377,12 +413,16 @@ def render(df_m2m):
                     )
                     fig_hist_m.update_traces(marker_color='#002b5c')
                     fig_hist_m.update_layout(plot_bgcolor='rgba(0,0,0,0)', height=400, xaxis_title="Consumo (MB)")
-                    st.plotly_chart(fig_hist_m, use_container_width=True)
+                    plotly_chart(fig_hist_m, use_container_width=True)
                 else:
                     st.warning("No hay consumo mensual activo.")
         else:
              st.warning("Faltan datos de consumo mensual.")
 
     # --- TABLA FINAL ---
-    with st.expander("📂 Ver datos crudos"):
-        st.dataframe(df_filt, use_container_width=True)
\ No newline at end of file
+    # Paginada en el servidor y solo bajo demanda (sin las columnas *_json por defecto)
+    paginated_table(
+        "📂 Ver datos crudos", df_m2m, key="m2m_crudos",
+        positions=None if sel_org == "Todas" else (lambda: np.flatnonzero((df_m2m["organization"] == sel_org).to_numpy())),
+        state=(sel_org,),
+    )
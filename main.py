@@ -1,15 +1,16 @@
 # main.py
+import time
+import pandas as pd
 import streamlit as st
 from config.settings import Settings
-from backend.api_clients import CoreClient
-from backend.M2M.data_m2m import process_m2m
-from backend.Device.data_device import prepare_boards, prepare_kiwi
-import json
-import pandas as pd
-from backend.Info.data_info import process_devicesInfo
+from backend.api_clients import make_client
+from backend.fleet_snapshot import SnapshotCache, build_fleet_snapshot, snapshot_cache
+from backend.refresher import get_refresher
+from backend.snapshot_store import snapshot_store
 
 # Importamos las nuevas vistas
-from frontend.views import devices_view, m2m_view, info_view
+from frontend.views import devices_view, m2m_view, info_view, diagnostics_view
+from backend.instrumentation import recorder
 
 # --- CONFIGURACIÓN INICIAL ---
 st.set_page_config(page_title="Dashboard Flota", layout="wide", page_icon="📊")
@@ -24,7 +25,7 @@ if not st.session_state['token']:
         st.title("🔐 Login Core")
         if st.button("Conectar con Credenciales"):
             with st.spinner("Autenticando..."):
-                client = CoreClient()
+                client = make_client()
                 token = client.login()
                 if token:
                     st.session_state['token'] = token
@@ -34,49 +35,70 @@ if not st.session_state['token']:
     st.stop()
 
 # --- CARGA DE DATOS ---
-client = CoreClient(st.session_state['token'])
-
-with st.spinner("Descargando datos de la flota..."):
-    # Descargamos
-    raw_m2m = client.get_m2m()
-    raw_dev = client.get_devicesB()
-    raw_dev2 = client.get_devicesKiwi()
-    raw_info = client.get_deviceInfo()
-    raw_models = client.get_deviceModels()
-    raw_soft = client.get_deviceSoftware()
-
-    # 1. CREAMOS PRIMERO LOS DATAFRAMES AUXILIARES
-    try:
-        df_models = pd.DataFrame(raw_models)
-        df_soft = pd.DataFrame(raw_soft)
-    except Exception as e:
-        print(f"Error creando DFs auxiliares: {e}")
-        df_models = pd.DataFrame()
-        df_soft = pd.DataFrame()
-
-    # 2. PROCESAMOS LOS DISPOSITIVOS PASANDO LOS DATAFRAMES AUXILIARES
-    # Aquí está el cambio clave: pasamos df_models y df_soft
-    df_dev = prepare_boards(raw_dev, df_models=df_models, df_soft=df_soft)
-    df_dev2 = prepare_kiwi(raw_dev2, df_models=df_models, df_soft=df_soft)
-    
-    df_m2m = process_m2m(raw_m2m)
-    df_info = process_devicesInfo(raw_info)
-    # --- CREACIÓN DE DATAFRAMES PARA MODELOS Y SOFTWARE ---
-    # Convertimos los datos crudos (que deberían ser listas de diccionarios) a DataFrames.
-    try:
-        df_models = pd.DataFrame(raw_models)
-        df_soft = pd.DataFrame(raw_soft)
-        
-        # Más diagnóstico para ver si tienen datos
-        if not df_models.empty:
-            print(f"DataFrame df_models creado con {len(df_models)} filas.")
-        if not df_soft.empty:
-            print(f"DataFrame df_soft creado con {len(df_soft)} filas.")
-            
-    except Exception as e:
-        print(f"Error al crear DataFrames de modelos/software: {e}")
-        df_models = pd.DataFrame()
-        df_soft = pd.DataFrame()
+client = make_client(st.session_state['token'])
+# Los datos se comparten entre sesiones por tenant; el token se valida por sesión
+cache_key = SnapshotCache.make_key(Settings.DEFAULT_TENANT_UUID)
+
+if not snapshot_cache.authorize(st.session_state['token'], cache_key, client.verify_token):
+    st.session_state['token'] = None
+    st.error("Sesión caducada o no autorizada. Vuelve a conectar.")
+    if st.button("Volver al login"):
+        st.rerun()
+    st.stop()
+
+
+def _build_snapshot(previous=None, names=None):
+    # Solo una sesión descarga; el resto espera a esta misma foto (single-flight)
+    sync = snapshot_cache.get_sync(cache_key)
+    built = build_fleet_snapshot(client, sync=sync, names=names, previous=previous)
+    for name, elapsed in built.timings.items():
+        estado = f"ERROR: {built.errors[name]}" if name in built.errors else "OK"
+        print(f"[fetch] {name}: {elapsed:.2f}s ({estado})")
+    for name, stats in built.sync_stats.items():
+        print(f"[sync] {name}: {stats}")
+    return built
+
+
+# --- NAVEGACIÓN ---
+# st.tabs ejecuta el cuerpo de todas las pestañas en cada rerun: con un selector solo se
+# ejecuta (y solo se descarga y procesa) la vista elegida
+VISTAS = ["📡 Dispositivos", "📶 Comunicaciones M2M", "💽 Informacion de Software"]
+# Endpoints que necesita cada vista (el catálogo lo añade build_fleet_snapshot si hace falta)
+VIEW_ENDPOINTS = {"Boards": ["boards"], "Kiwi": ["kiwi"], VISTAS[1]: ["m2m"], VISTAS[2]: ["info"]}
+
+vista = st.radio("Vista", VISTAS, horizontal=True, key="vista", label_visibility="collapsed")
+if vista == VISTAS[0]:
+    vista = st.radio("Dispositivos", ["Boards", "Kiwi"], horizontal=True, key="vista_dispositivos",
+                     label_visibility="collapsed")
+endpoints = VIEW_ENDPOINTS[vista]
+
+# Con el refresco en segundo plano la página lee la última foto publicada (aunque haya caducado:
+# la mantiene al día el refresco); sin él, la foto vigente dentro del TTL
+refresher = get_refresher()
+if refresher is not None:
+    # Servidor recién arrancado: se pinta ya con la última foto de disco
+    snapshot_store.warm_start(snapshot_cache, cache_key)
+    snapshot = snapshot_cache.latest(cache_key)
+else:
+    snapshot = snapshot_cache.get(cache_key)
+
+if snapshot is None or snapshot.missing(endpoints):
+    # Primera vez que se abre esta vista: descarga con el token de la sesión solo de sus endpoints.
+    # La foto se guarda en disco ya terminada (con su created_at definitivo)
+    with st.spinner("Descargando datos de la flota..."):
+        snapshot = snapshot_cache.get_or_build(
+            cache_key, _build_snapshot, names=endpoints, stale_ok=refresher is not None,
+            on_built=lambda built: snapshot_store.save_async(cache_key, built),
+        )
+
+if snapshot.all_failed():
+    # Sin conexión con la API: modo offline con la última foto buena (memoria o disco)
+    snapshot = snapshot_cache.latest(cache_key) or snapshot_store.load_latest(cache_key) or snapshot
+
+
+def frame(name):
+    # Foto offline de disco puede no tener todos los endpoints: la vista muestra "sin datos"
+    return snapshot.frames.get(name, pd.DataFrame())
 
 
 # --- INTERFAZ GRÁFICA ---
@@ -84,31 +106,63 @@ with st.spinner("Descargando datos de la flota..."):
 with st.sidebar:
     st.title("Kiconex Dashboard")
     st.success("🟢 Conectado")
+    if refresher is not None and refresher.status()["last_refresh"]:
+        estado = refresher.status()
+        st.caption(f"🕒 Último refresco hace {int(time.time() - estado['last_refresh'])} s "
+                   f"({estado['last_duration']:.1f} s: {', '.join(estado['last_endpoints'])})")
+        if estado["last_error"]:
+            st.caption(f"⚠️ {estado['last_error']}")
+    else:
+        st.caption(f"🕒 Datos de hace {int(snapshot.age())} s (caducan a los {snapshot_cache.ttl} s)")
+    if snapshot.origin == "disco":
+        st.info(f"📦 Datos de la foto guardada en disco ({snapshot.version})")
+    if snapshot.errors:
+        st.warning("Endpoints con error: " + ", ".join(snapshot.errors))
+    if snapshot.memory:
+        with st.expander("💾 Memoria de los datos"):
+            for name, report in snapshot.memory.items():
+                st.caption(f"**{name}**: {report['rows']} filas · {report['mb']} MB")
+    if st.button("🔄 Actualizar datos"):
+        if refresher is not None:
+            # La página no descarga: se pide al refresco que se adelante
+            refresher.refresh_now()
+            st.toast("Refresco solicitado")
+        else:
+            snapshot_cache.invalidate(cache_key)
+            st.rerun()
     if st.button("Cerrar Sesión"):
+        # Los datos son compartidos: al salir solo se olvida la validación de este token
+        snapshot_cache.revoke(st.session_state['token'])
         st.session_state['token'] = None
         st.rerun()
+    # Se rellena al final, cuando ya están medidas las vistas de este rerun
+    diagnostics_slot = st.container() if Settings.DIAGNOSTICS_PANEL else None
 
-# Pestañas principales
-tab1, tab2, tab3 = st.tabs(["📡 Dispositivos", "📶 Comunicaciones M2M", "💽 Informacion de Software"])
-
-with tab1:
-    sub1, sub2 = st.tabs(["Boards", "Kiwi"])
-    with sub1:
-        devices_view.render(df_dev)
-    with sub2:
-        devices_view.render(df_dev2)
-
-with tab2:
+# Vista seleccionada (las demás no se ejecutan)
+if vista == "Boards":
+    devices_view.render(frame("boards"))
+elif vista == "Kiwi":
+    devices_view.render(frame("kiwi"))
+elif vista == VISTAS[1]:
     # Delegamos el pintado a la vista de M2M
-    m2m_view.render(df_m2m)
-
-with tab3:
+    m2m_view.render(frame("m2m"), cube=snapshot.frames.get("m2m_cube"))
+else:
     # Aquí puedes añadir una vista para modelos y software si es necesario
     # Por ahora, solo renderizamos la vista de Info que ya tenías
-    info_view.render(df_info)
+    info_view.render(frame("info"))
     
     # Ejemplo de uso de los DataFrames de Modelos y Software (descomentar si se va a usar)
     # st.subheader("Modelos de Dispositivo")
-    # st.dataframe(df_models)
+    # st.dataframe(frame("models"))
     # st.subheader("Versiones de Software")
-    # st.dataframe(df_soft)
\ No newline at end of file
+    # st.dataframe(frame("software"))
+
+# --- DIAGNÓSTICO ---
+if diagnostics_slot is not None:
+    with diagnostics_slot:
+        diagnostics_view.render()
+if Settings.METRICS_FILE:
+    try:
+        recorder.write_prometheus()
+    except OSError as e:
+        print(f"Error escribiendo métricas en {Settings.METRICS_FILE}: {e}")
@@ -0,0 +1,44 @@
+from backend.api_clients import CoreClient
+
+PAGINATION = {"mode": "page", "page_param": "page", "size_param": "limit", "page_size": 1000,
+              "first_page": 1, "total_field": "total"}
+
+
+class _CappedClient(CoreClient):
+    """API que limita `limit` a `cap` registros por página."""
+
+    def __init__(self, records, cap, with_total=False):
+        super().__init__(token="test", session=object())
+        self.records = records
+        self.cap = cap
+        self.with_total = with_total
+        self.requests = 0
+
+    def _request_json(self, url, params=None):
+        self.requests += 1
+        size = min(int(params["limit"]), self.cap)
+        start = (int(params["page"]) - 1) * size
+        page = self.records[start:start + size]
+        return {"data": page, "total": len(self.records)} if self.with_total else page
+
+
+def _records(n):
+    return [{"icc": str(i)} for i in range(n)]
+
+
+def test_page_mode_does_not_stop_at_a_short_page():
+    client = _CappedClient(_records(2500), cap=300)
+
+    pages = list(client._iter_pages("url", None, PAGINATION))
+
+    assert sum(len(page) for page in pages) == 2500
+    assert client.requests == 10  # 9 páginas con datos + la vacía
+
+
+def test_page_mode_stops_at_the_reported_total():
+    client = _CappedClient(_records(900), cap=300, with_total=True)
+
+    pages = list(client._iter_pages("url", None, PAGINATION))
+
+    assert sum(len(page) for page in pages) == 900
+    assert client.requests == 3
@@ -0,0 +1,28 @@
+from backend.M2M.data_m2m import extract_alarm_count, process_m2m
+
+
+def test_alarm_count_sums_counter_list():
+    assert extract_alarm_count([0]) == 0
+    assert extract_alarm_count([2]) == 2
+    assert extract_alarm_count(None) == 0
+
+
+def test_process_m2m_alarm_count_from_counter_lists():
+    records = [
+        {"icc": "1", "alarms": "[0]"},
+        {"icc": "2", "alarms": [0]},
+        {"icc": "3", "alarms": "[2]"},
+        {"icc": "4", "alarms": [2]},
+    ]
+    df = process_m2m(records)
+
+    assert df["alarm_count"].tolist() == [0, 0, 2, 2]
+    assert int((df["alarm_count"] > 0).sum()) == 2
+
+
+def test_consumption_is_float_when_every_value_is_missing():
+    df = process_m2m([{"icc": "1", "consumptionDaily": None}, {"icc": "2", "consumptionDaily": "no-json"}])
+
+    assert df["cons_daily"].dtype == "float64"
+    assert df["cons_daily"].tolist() == [0.0, 0.0]
+    assert df["usage_tier_daily"].astype(str).tolist() == ["Inactivo (0 MB)"] * 2
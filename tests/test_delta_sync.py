@@ -0,0 +1,65 @@
+import pandas as pd
+from backend.delta_sync import DeltaSync
+
+
+def _processor(raw):
+    df = pd.DataFrame(raw).copy()
+    df["processed"] = True
+    return df
+
+
+def _synced(since_param=None):
+    sync = DeltaSync("m2m", "icc", since_param=since_param, watermark_field="updated_at")
+    raw = [{"icc": "1", "updated_at": "2024-01-01"}, {"icc": "2", "updated_at": "2024-01-02"}]
+    sync.apply(raw, _processor)
+    return sync
+
+
+def test_empty_partial_payload_keeps_processed_frame():
+    sync = _synced(since_param="updated_since")
+    before = sync.processed
+
+    result = sync.apply([], _processor, is_partial=True)
+
+    assert result is before
+    assert list(result["icc"]) == ["1", "2"]
+    assert sync.last_stats["mode"] == "parcial"
+    assert sync.watermark == "2024-01-02"
+
+
+def test_empty_full_payload_returns_empty_frame_with_columns():
+    sync = _synced()
+    columns = list(sync.processed.columns)
+
+    result = sync.apply([], _processor)
+
+    assert result.empty
+    assert list(result.columns) == columns
+    assert sync.hashes is None and sync.processed is None
+
+    # La siguiente descarga con datos vuelve a procesarse entera
+    again = sync.apply([{"icc": "3", "updated_at": "2024-01-03"}], _processor)
+    assert list(again["icc"]) == ["3"]
+
+
+def test_full_downloads_are_processed_whole_without_since_param():
+    sync = _synced()
+
+    sync.apply([{"icc": "1", "updated_at": "2024-01-01"}], _processor)
+
+    assert sync.hashes is None
+    assert sync.last_stats["mode"] == "completo"
+
+
+def test_diff_detects_changes_in_nested_columns():
+    sync = DeltaSync("m2m", "icc", diff_full=True)
+    raw = [{"icc": "1", "presence": {"level": "online", "ts": 1}}, {"icc": "2", "presence": None}]
+    sync.apply(raw, _processor)
+    same = [{"icc": "1", "presence": {"ts": 1, "level": "online"}}, {"icc": "2", "presence": None}]
+    before = sync.processed
+
+    assert sync.apply(same, _processor) is before
+
+    changed = [{"icc": "1", "presence": {"level": "offline", "ts": 2}}, {"icc": "2", "presence": None}]
+    sync.apply(changed, _processor)
+    assert sync.last_stats["changed"] == 1
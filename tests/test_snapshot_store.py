@@ -0,0 +1,28 @@
+import os
+import pandas as pd
+from backend.fleet_snapshot import FleetSnapshot
+from backend.snapshot_store import SnapshotStore
+
+
+def _inode(store, key, version, name):
+    return os.stat(os.path.join(store.root, key, version, f"{name}.arrow")).st_ino
+
+
+def test_unchanged_frames_are_linked_not_rewritten(tmp_path):
+    store = SnapshotStore(root=str(tmp_path), keep=3)
+    boards = pd.DataFrame({"uuid": ["a", "b"], "info": [{"x": 1}, None]})
+    first = store.save("t", FleetSnapshot({"boards": boards, "m2m": pd.DataFrame({"icc": ["1"]})}))
+
+    m2m = pd.DataFrame({"icc": ["1", "2"]})
+    second = store.save("t", FleetSnapshot({"boards": boards, "m2m": m2m}))
+
+    assert _inode(store, "t", first, "boards") == _inode(store, "t", second, "boards")
+    assert _inode(store, "t", first, "m2m") != _inode(store, "t", second, "m2m")
+
+    loaded = store.load("t", second)
+    assert loaded.frames["boards"]["info"].tolist() == [{"x": 1}, None]
+    assert loaded.frames["m2m"]["icc"].tolist() == ["1", "2"]
+
+    # Tras cargar de disco, los frames cargados también se enlazan en la siguiente versión
+    third = store.save("t", loaded)
+    assert _inode(store, "t", second, "m2m") == _inode(store, "t", third, "m2m")
@@ -0,0 +1,30 @@
+from backend.synthetic import SyntheticFleet
+from backend.replay_client import ReplayClient
+from backend.json_columns import get_parse_failures, reset_parse_failures
+from backend.M2M.data_m2m import process_m2m
+
+
+def test_size_accepts_digit_strings():
+    assert SyntheticFleet("3000").size == 3000
+    assert SyntheticFleet(" 50000 ").size == 50000
+    assert SyntheticFleet("10k").size == 10_000
+    assert SyntheticFleet(1234).size == 1234
+
+
+def test_replay_client_with_numeric_synthetic_setting():
+    client = ReplayClient(synthetic="300", latency_ms=0, scale=1)
+    results = client.fetch_all()
+
+    assert all(res["error"] is None for res in results.values())
+    assert len(results["boards"]["data"]) == 300
+
+
+def test_text_style_parses_like_the_api_in_process_m2m():
+    reset_parse_failures()
+    as_text = process_m2m(SyntheticFleet(200, json_style="text").records("m2m"))
+    as_dict = process_m2m(SyntheticFleet(200, json_style="dict").records("m2m"))
+
+    assert get_parse_failures() == {}
+    assert as_text["cons_daily"].tolist() == as_dict["cons_daily"].tolist()
+    assert as_text["cons_month"].tolist() == as_dict["cons_month"].tolist()
+    assert as_text["cons_month"].sum() > 0